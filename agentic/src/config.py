@@ -1,6 +1,11 @@
 """Configuration and constants."""
+from collections import namedtuple
 
-EXERCISE_MUSCLE_MAP = {
+import numpy as np
+
+ExerciseInfo = namedtuple("ExerciseInfo", "exercise_id targeted_muscles primary_muscle")
+
+_EXERCISE_MUSCLE_MAP_RAW = {
     "Bench Press (Barbell)": {
         "exercise_id": "bench_press",
         "targeted_muscles": ["chest", "shoulders", "triceps"],
@@ -73,6 +78,13 @@ EXERCISE_MUSCLE_MAP = {
     }
 }
 
+EXERCISE_MUSCLE_MAP = {title: ExerciseInfo(**info) for title, info in _EXERCISE_MUSCLE_MAP_RAW.items()}
+
+# Parallel arrays in EXERCISE_MUSCLE_MAP order, for vectorized lookups
+EXERCISE_TITLE_ARR = np.array(list(EXERCISE_MUSCLE_MAP))
+EXERCISE_ID_ARR = np.array([info.exercise_id for info in EXERCISE_MUSCLE_MAP.values()])
+PRIMARY_MUSCLE_ARR = np.array([info.primary_muscle for info in EXERCISE_MUSCLE_MAP.values()])
+
 # INTENT_TYPES--------------------------------
 
 class Intent:
@@ -1,7 +1,9 @@
 """Data access - filtering and retrieval."""
-import json
+from functools import lru_cache
+import numpy as np
+import orjson
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from .config import EXERCISE_MUSCLE_MAP
 
 
@@ -32,94 +34,114 @@ Examples:
 
 Respond with ONLY the JSON, no explanation."""
 
+# Derived from EXERCISE_MUSCLE_MAP once at import; the map is static.
+_EXERCISE_IDS = tuple(info.exercise_id for info in EXERCISE_MUSCLE_MAP.values())
+_MUSCLES = tuple(sorted({info.primary_muscle for info in EXERCISE_MUSCLE_MAP.values()}))
+_EXERCISES_JOINED = ", ".join(_EXERCISE_IDS)
+_MUSCLES_JOINED = ", ".join(_MUSCLES)
+_PRECOMPUTED_PROMPT = EXTRACTION_PROMPT.format(exercises=_EXERCISES_JOINED, muscles=_MUSCLES_JOINED)
+# Byte-identical across calls so the provider can reuse its cached prefix
+_SYSTEM_MSG = {"role": "system", "content": _PRECOMPUTED_PROMPT}
+_EXERCISE_TITLE_LOWER = [
+    (title.lower(), info.exercise_id.replace("_", " "), info.exercise_id)
+    for title, info in EXERCISE_MUSCLE_MAP.items()
+]
+
+_MUSCLE_GROUPS = {
+    "push": ["chest", "shoulders", "triceps"],
+    "pull": ["back", "lats", "traps", "biceps"],
+    "legs": ["quads", "hamstrings", "glutes"],
+    "leg": ["quads", "hamstrings", "glutes"]  # Singular form
+}
+_MOCK_MUSCLES = ["chest", "biceps", "triceps", "shoulders", "back", "lats", "traps", "quads", "hamstrings", "glutes"]
+_TIMEFRAME_KEYWORDS = {
+    "last week": "last_week",
+    "last month": "last_month",
+}
+
 
 def extract_query_params(query: str, client=None) -> dict:
     """Extract targets (can be multiple) and timeframe from query."""
     if client is None:
         return _extract_mock(query)
 
-    exercises = [info["exercise_id"] for info in EXERCISE_MUSCLE_MAP.values()]
-    muscles = list(set(info["primary_muscle"] for info in EXERCISE_MUSCLE_MAP.values()))
-
-    prompt = EXTRACTION_PROMPT.format(
-        exercises=", ".join(exercises),
-        muscles=", ".join(muscles)
-    )
-
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": prompt},
+            _SYSTEM_MSG,
             {"role": "user", "content": query}
         ],
         max_tokens=150
     )
 
     try:
-        result = json.loads(response.choices[0].message.content.strip())
-        target_type = result.get("target_type", "all")
-        target_values = result.get("target_values", [])
-
-        # Convert to targets list format
-        targets = []
-        if target_type != "all" and target_values:
-            for value in target_values:
-                targets.append({"type": target_type.replace("muscle_group", "muscle"), "value": value})
-
-        return {
-            "targets": targets,
-            "timeframe": {"type": "relative" if result.get("timeframe", "all") != "all" else "all",
-                         "value": result.get("timeframe")}
-        }
+        result = orjson.loads(response.choices[0].message.content.strip())
+        return parse_extraction_result(result)
     except:
         return _extract_mock(query)
 
 
+def parse_extraction_result(result: dict) -> dict:
+    """Convert extraction JSON (target_type/target_values/timeframe) to query params."""
+    target_type = result.get("target_type", "all")
+    target_values = result.get("target_values", [])
+
+    # Convert to targets list format
+    targets = []
+    if target_type != "all" and target_values:
+        for value in target_values:
+            targets.append({"type": target_type.replace("muscle_group", "muscle"), "value": value})
+
+    return {
+        "targets": targets,
+        "timeframe": {"type": "relative" if result.get("timeframe", "all") != "all" else "all",
+                     "value": result.get("timeframe")}
+    }
+
+
 def _extract_mock(query: str) -> dict:
     """Fallback keyword-based extraction with multi-target support."""
-    targets = []
-    query_lower = query.lower()
+    targets, timeframe_value = _match_keywords(query.lower())
 
-    # Check for muscle groups first
-    muscle_groups = {
-        "push": ["chest", "shoulders", "triceps"],
-        "pull": ["back", "lats", "traps", "biceps"],
-        "legs": ["quads", "hamstrings", "glutes"],
-        "leg": ["quads", "hamstrings", "glutes"]  # Singular form
+    # Fresh dicts per call; the cached match result stays immutable
+    return {
+        "targets": [{"type": target_type, "value": value} for target_type, value in targets],
+        "timeframe": {"type": "relative", "value": timeframe_value} if timeframe_value
+                     else {"type": "all", "value": None}
     }
 
-    for group_name, muscles in muscle_groups.items():
-        if group_name in query_lower:
-            for muscle in muscles:
-                targets.append({"type": "muscle", "value": muscle})
-            break
+
+@lru_cache(maxsize=512)
+def _match_keywords(query_lower: str) -> tuple:
+    """Return ((target_type, value), ...) and the timeframe value (or None)."""
+    # Plain substring tests in declaration order, so plurals ("squats",
+    # "pushups") match and the first listed keyword wins
+    targets = ()
+
+    # Check for muscle groups first
+    group = next((g for g in _MUSCLE_GROUPS if g in query_lower), None)
+    if group is not None:
+        targets = tuple(("muscle", muscle) for muscle in _MUSCLE_GROUPS[group])
 
     # If no group found, check for specific exercises
     if not targets:
-        for title, info in EXERCISE_MUSCLE_MAP.items():
-            if info["exercise_id"].replace("_", " ") in query_lower or title.lower() in query_lower:
-                targets.append({"type": "exercise", "value": info["exercise_id"]})
-                break
+        exercise_id = next(
+            (eid for title, spaced, eid in _EXERCISE_TITLE_LOWER if spaced in query_lower or title in query_lower),
+            None
+        )
+        if exercise_id is not None:
+            targets = (("exercise", exercise_id),)
 
     # If no exercise found, check for specific muscles
     if not targets:
-        muscles = ["chest", "biceps", "triceps", "shoulders", "back", "lats", "traps", "quads", "hamstrings", "glutes"]
-        for muscle in muscles:
-            if muscle in query_lower:
-                targets.append({"type": "muscle", "value": muscle})
-                break
+        muscle = next((m for m in _MOCK_MUSCLES if m in query_lower), None)
+        if muscle is not None:
+            targets = (("muscle", muscle),)
 
     # Timeframe extraction
-    timeframe = {"type": "all", "value": None}
-    if "last week" in query_lower:
-        timeframe = {"type": "relative", "value": "last_week"}
-    elif "last month" in query_lower:
-        timeframe = {"type": "relative", "value": "last_month"}
+    timeframe_value = next((v for k, v in _TIMEFRAME_KEYWORDS.items() if k in query_lower), None)
 
-    return {
-        "targets": targets,
-        "timeframe": timeframe
-    }
+    return targets, timeframe_value
 
 
 def apply_timeframe_filter(df: pd.DataFrame, timeframe: dict) -> pd.DataFrame:
@@ -127,21 +149,28 @@ def apply_timeframe_filter(df: pd.DataFrame, timeframe: dict) -> pd.DataFrame:
     if timeframe["type"] == "all" or timeframe["value"] == "all":
         return df
     
+    cutoff = _timeframe_cutoff(timeframe["value"])
+    if cutoff is None:
+        return df
+    
+    # Plain datetime64 compare on the underlying array, no Timestamp boxing
+    return df[df["start_time"].to_numpy() >= cutoff]
+
+
+def _timeframe_cutoff(value: str):
+    """Return the datetime64 lower bound for a relative timeframe, or None."""
     now = datetime.now()
-    value = timeframe["value"]
+    now64 = np.datetime64(now)
     
     if value == "last_week":
-        cutoff = now - timedelta(days=7)
+        return now64 - np.timedelta64(7, "D")
     elif value == "last_month":
-        cutoff = now - timedelta(days=30)
+        return now64 - np.timedelta64(30, "D")
     elif value == "this_week":
-        cutoff = now - timedelta(days=now.weekday())
+        return now64 - np.timedelta64(now.weekday(), "D")
     elif value == "this_month":
-        cutoff = now.replace(day=1)
-    else:
-        return df
-    
-    return df[df["start_time"] >= cutoff]
+        return np.datetime64(now.replace(day=1))
+    return None
 
 
 def get_exercise_history(df: pd.DataFrame, params: dict) -> pd.DataFrame:
@@ -152,14 +181,15 @@ def get_exercise_history(df: pd.DataFrame, params: dict) -> pd.DataFrame:
     if not targets:
         return result.sort_values("start_time", ascending=False)
 
-    # Collect matching rows for all targets
-    mask = pd.Series([False] * len(result), index=result.index)
+    # Collect matching rows for all targets: one isin pass per target type
+    exercise_values = [t["value"] for t in targets if t["type"] == "exercise" and t["value"]]
+    muscle_values = [t["value"] for t in targets if t["type"] == "muscle" and t["value"]]
 
-    for target in targets:
-        if target["type"] == "exercise" and target["value"]:
-            mask |= (result["exercise_id"] == target["value"])
-        elif target["type"] == "muscle" and target["value"]:
-            mask |= (result["primary_muscle"] == target["value"])
+    mask = np.zeros(len(result), dtype=bool)
+    if exercise_values:
+        mask |= result["exercise_id"].isin(exercise_values).to_numpy()
+    if muscle_values:
+        mask |= result["primary_muscle"].isin(muscle_values).to_numpy()
 
     result = result[mask]
     return result.sort_values("start_time", ascending=False)
@@ -171,18 +201,22 @@ def format_history_response(df: pd.DataFrame) -> str:
         return "No matching records found."
     
     lines = []
+    df = df.assign(session_date=df["start_time"].dt.normalize())
     
-    for (date, exercise), group in df.groupby([df["start_time"].dt.date, "exercise_title"]):
+    # Groups keep their rows' incoming order; sorting each one by set_index
+    # (not the whole frame) breaks ties exactly as the per-group loop did
+    for (date, exercise), group in df.groupby(["session_date", "exercise_title"], observed=True):
         group = group.sort_values("set_index")
-        
-        sets = [f"{row['weight_kg']}kg x {int(row['reps'])}" 
-                for _, row in group.iterrows() if row["weight_kg"] > 0]
+        w = group["weight_kg"].to_numpy(dtype=float)
+        r = group["reps"].to_numpy(dtype=float)
+        mask = w > 0
+        sets = [f"{wi}kg x {ri}" for wi, ri in zip(w[mask].tolist(), r[mask].astype(np.int64).tolist())]
         
         sets_str = " → ".join(sets) if sets else "No weight data"
-        total_vol = (group["weight_kg"] * group["reps"]).sum()
-        max_weight = group["weight_kg"].max()
+        total_vol = float((w * r).sum())
+        max_weight = float(w.max())
         
-        lines.append(f"\n{date} | {exercise}")
+        lines.append(f"\n{date.date()} | {exercise}")
         lines.append(f"  Sets: {sets_str}")
         lines.append(f"  Summary: {len(group)} sets, max {max_weight}kg, volume {total_vol:.0f}kg")
     
@@ -1,8 +1,12 @@
 """Data analysis - generates comprehensive user profile JSON."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import orjson
 import pandas as pd
-import json
-from datetime import datetime, timedelta
-from .config import EXERCISE_MUSCLE_MAP
+from datetime import datetime
 
 
 def generate_user_profile(df: pd.DataFrame, output_path: str = None) -> dict:
@@ -10,6 +14,13 @@ def generate_user_profile(df: pd.DataFrame, output_path: str = None) -> dict:
     now = datetime.now()
     weeks_tracked = max((df["start_time"].max() - df["start_time"].min()).days / 7, 1)
 
+    # Session day, computed once and shared by every stat below; identifier
+    # columns become categoricals so masks and groupbys work on integer codes
+    df = df.assign(
+        session_date=df["start_time"].dt.normalize(),
+        **{c: df[c].astype("category") for c in ("exercise_id", "exercise_title", "primary_muscle")}
+    )
+
     profile = {
         "generated_at": now.isoformat(),
         "total_sets": len(df),
@@ -20,19 +31,29 @@ def generate_user_profile(df: pd.DataFrame, output_path: str = None) -> dict:
         "global": calculate_global_stats(df, weeks_tracked)
     }
 
-    # Per-exercise stats
-    for exercise_id in df["exercise_id"].unique():
-        ex_df = df[df["exercise_id"] == exercise_id]
-        profile["exercises"][exercise_id] = calculate_exercise_stats(ex_df, weeks_tracked)
+    # Per-exercise and per-muscle stats are independent, so fan them out over
+    # a thread pool (the heavy lifting is NumPy/pandas, which releases the GIL)
+    exercise_groups = list(df.groupby("exercise_id", sort=False, observed=True))
+    muscle_groups = list(df.groupby("primary_muscle", sort=False, observed=True))
+    overall_sets = len(df)
 
-    # Per-muscle stats
-    for muscle in df["primary_muscle"].unique():
-        muscle_df = df[df["primary_muscle"] == muscle]
-        profile["muscles"][muscle] = calculate_muscle_stats(muscle_df, df, muscle, weeks_tracked)
+    workers = min(os.cpu_count() or 1, max(len(exercise_groups), len(muscle_groups), 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        exercise_stats = executor.map(
+            lambda group: calculate_exercise_stats(group[1], weeks_tracked), exercise_groups
+        )
+        muscle_stats = executor.map(
+            lambda group: calculate_muscle_stats(group[1], overall_sets, group[0], weeks_tracked), muscle_groups
+        )
+        # map() yields in submission order, keeping the original key order
+        for (exercise_id, _), stats in zip(exercise_groups, exercise_stats):
+            profile["exercises"][exercise_id] = stats
+        for (muscle, _), stats in zip(muscle_groups, muscle_stats):
+            profile["muscles"][muscle] = stats
 
     if output_path:
-        with open(output_path, "w") as f:
-            json.dump(profile, f, indent=2, default=str)
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(profile, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str))
 
     return profile
 
@@ -48,23 +69,38 @@ def calculate_e1rm(weight: float, reps: int) -> float:
 
 def calculate_exercise_stats(df: pd.DataFrame, weeks_tracked: float) -> dict:
     """Calculate comprehensive stats for a single exercise."""
-    df = df.copy()
-    df["volume"] = df["weight_kg"] * df["reps"]
-    df["e1rm"] = df.apply(lambda r: calculate_e1rm(r["weight_kg"], r["reps"]), axis=1)
+    w = df["weight_kg"].to_numpy(dtype=float)
+    r = df["reps"].to_numpy(dtype=float)
+    valid_mask = (w > 0) & (r > 0)
+    volume = w * r
+    # Vectorized Epley, same rules as calculate_e1rm
+    e1rm = np.where(valid_mask, np.where(r == 1, w, w * (1 + r / 30)), 0.0)
     
     # Basic volume
     total_sets = len(df)
     total_reps = int(df["reps"].sum())
-    total_volume = float(df["volume"].sum())
+    total_volume = float(volume.sum())
     
-    # PRs
-    valid = df[(df["reps"] > 0) & (df["weight_kg"] > 0)]
-    pr_weight_row = valid.loc[valid["weight_kg"].idxmax()] if not valid.empty else None
-    pr_volume_row = valid.loc[valid["volume"].idxmax()] if not valid.empty else None
-    pr_e1rm_row = valid.loc[valid["e1rm"].idxmax()] if not valid.empty else None
+    # PRs (argmax keeps the first max, matching idxmax)
+    valid = df[valid_mask]
+    valid_pos = np.flatnonzero(valid_mask)
+    if valid_pos.size:
+        t = df["start_time"].to_numpy()
+
+        def set_record(pos):
+            # (kg, reps, date) as plain Python values, extracted once per PR
+            return float(w[pos]), int(r[pos]), str(pd.Timestamp(t[pos]).date())
+
+        pr_volume_pos = valid_pos[np.argmax(volume[valid_pos])]
+        pr_e1rm_pos = valid_pos[np.argmax(e1rm[valid_pos])]
+        pr_weight_rec = set_record(valid_pos[np.argmax(w[valid_pos])])
+        pr_volume_rec = set_record(pr_volume_pos)
+        pr_e1rm_rec = set_record(pr_e1rm_pos)
+    else:
+        pr_weight_rec = pr_volume_rec = pr_e1rm_rec = None
     
     # Frequency & consistency
-    sessions = df["start_time"].dt.date.nunique()
+    sessions = df["session_date"].nunique()
     frequency = round(sessions / weeks_tracked, 1)
     days_since_last = (datetime.now() - df["start_time"].max()).days
     
@@ -87,23 +123,23 @@ def calculate_exercise_stats(df: pd.DataFrame, weeks_tracked: float) -> dict:
         "total_volume_kg": round(total_volume, 1),
         
         "pr_weight": {
-            "kg": float(pr_weight_row["weight_kg"]) if pr_weight_row is not None else 0,
-            "reps": int(pr_weight_row["reps"]) if pr_weight_row is not None else 0,
-            "date": str(pr_weight_row["start_time"].date()) if pr_weight_row is not None else None,
-            "display": f"{pr_weight_row['weight_kg']}kg x {int(pr_weight_row['reps'])}" if pr_weight_row is not None else "N/A"
-        },
+            "kg": pr_weight_rec[0],
+            "reps": pr_weight_rec[1],
+            "date": pr_weight_rec[2],
+            "display": f"{pr_weight_rec[0]}kg x {pr_weight_rec[1]}"
+        } if pr_weight_rec is not None else {"kg": 0, "reps": 0, "date": None, "display": "N/A"},
         "pr_volume": {
-            "kg": float(pr_volume_row["weight_kg"]) if pr_volume_row is not None else 0,
-            "reps": int(pr_volume_row["reps"]) if pr_volume_row is not None else 0,
-            "volume": float(pr_volume_row["volume"]) if pr_volume_row is not None else 0,
-            "date": str(pr_volume_row["start_time"].date()) if pr_volume_row is not None else None,
-            "display": f"{pr_volume_row['weight_kg']}kg x {int(pr_volume_row['reps'])} = {pr_volume_row['volume']}kg" if pr_volume_row is not None else "N/A"
-        },
+            "kg": pr_volume_rec[0],
+            "reps": pr_volume_rec[1],
+            "volume": float(volume[pr_volume_pos]),
+            "date": pr_volume_rec[2],
+            "display": f"{pr_volume_rec[0]}kg x {pr_volume_rec[1]} = {volume[pr_volume_pos]}kg"
+        } if pr_volume_rec is not None else {"kg": 0, "reps": 0, "volume": 0, "date": None, "display": "N/A"},
         "estimated_1rm": {
-            "value": round(float(pr_e1rm_row["e1rm"]), 1) if pr_e1rm_row is not None else 0,
-            "from_set": f"{pr_e1rm_row['weight_kg']}kg x {int(pr_e1rm_row['reps'])}" if pr_e1rm_row is not None else "N/A",
-            "date": str(pr_e1rm_row["start_time"].date()) if pr_e1rm_row is not None else None
-        },
+            "value": round(float(e1rm[pr_e1rm_pos]), 1),
+            "from_set": f"{pr_e1rm_rec[0]}kg x {pr_e1rm_rec[1]}",
+            "date": pr_e1rm_rec[2]
+        } if pr_e1rm_rec is not None else {"value": 0, "from_set": "N/A", "date": None},
         "top_sets": top_sets,
         
         "trend": trend,
@@ -124,18 +160,20 @@ def calculate_exercise_stats(df: pd.DataFrame, weeks_tracked: float) -> dict:
 
 def calculate_trend(df: pd.DataFrame) -> dict:
     """Calculate trend comparing recent 4 weeks vs previous 4 weeks."""
-    now = datetime.now()
-    cutoff_recent = now - timedelta(days=28)
-    cutoff_previous = now - timedelta(days=56)
+    now = np.datetime64(datetime.now())
+    cutoff_recent = now - np.timedelta64(28, "D")
+    cutoff_previous = now - np.timedelta64(56, "D")
     
-    recent = df[df["start_time"] >= cutoff_recent]
-    previous = df[(df["start_time"] >= cutoff_previous) & (df["start_time"] < cutoff_recent)]
+    t = df["start_time"].to_numpy()
+    w = df["weight_kg"].to_numpy(dtype=float)
+    recent = t >= cutoff_recent
+    previous = (t >= cutoff_previous) & ~recent
     
-    if recent.empty or previous.empty:
+    if not recent.any() or not previous.any():
         return {"direction": "insufficient_data", "change_percent": 0}
     
-    avg_recent = recent["weight_kg"].mean()
-    avg_previous = previous["weight_kg"].mean()
+    avg_recent = w[recent].mean()
+    avg_previous = w[previous].mean()
     
     if avg_previous == 0:
         return {"direction": "insufficient_data", "change_percent": 0}
@@ -157,15 +195,19 @@ def calculate_trend(df: pd.DataFrame) -> dict:
     }
 
 
+_REP_BUCKET_EDGES = np.array([0, 5, 10])
+
+
 def calculate_rep_distribution(df: pd.DataFrame) -> dict:
     """Calculate what percentage of sets fall into each rep range."""
     total = len(df)
     if total == 0:
         return {"heavy_1_5": 0, "moderate_6_10": 0, "light_11_plus": 0}
     
-    heavy = len(df[(df["reps"] >= 1) & (df["reps"] <= 5)])
-    moderate = len(df[(df["reps"] >= 6) & (df["reps"] <= 10)])
-    light = len(df[df["reps"] > 10])
+    # Bucket 0: no reps, 1: 1-5, 2: 6-10, 3: 11+
+    buckets = np.searchsorted(_REP_BUCKET_EDGES, df["reps"].to_numpy(), side="left")
+    counts = np.bincount(buckets, minlength=4)
+    heavy, moderate, light = int(counts[1]), int(counts[2]), int(counts[3])
     
     return {
         "heavy_1_5": round(100 * heavy / total, 1),
@@ -195,24 +237,28 @@ def get_top_sets(df: pd.DataFrame, n: int = 5) -> list:
 def get_recent_sessions(df: pd.DataFrame, n: int = 3) -> list:
     """Get detailed summary of last n sessions."""
     sessions = []
-    dates = df["start_time"].dt.date.unique()
-    dates = sorted(dates, reverse=True)[:n]
-    
-    for date in dates:
-        session_df = df[df["start_time"].dt.date == date].sort_values("set_index")
+    recent_dates = np.sort(df["session_date"].unique())[::-1][:n]
+    # Each day's rows keep their original order before the set_index sort,
+    # so ties (several sessions/exercises per day) break as in the per-date loop
+    groups = dict(tuple(df[df["session_date"].isin(recent_dates)].groupby("session_date", sort=False)))
+    
+    for date in recent_dates:
+        session_df = groups[date].sort_values("set_index")
+        w = session_df["weight_kg"].to_numpy(dtype=float)
+        r = session_df["reps"].to_numpy(dtype=float)
+        mask = w > 0
         sets_list = [
-            f"{row['weight_kg']}kg x {int(row['reps'])}"
-            for _, row in session_df.iterrows()
-            if row["weight_kg"] > 0
+            f"{wi}kg x {ri}"
+            for wi, ri in zip(w[mask].tolist(), r[mask].astype(np.int64).tolist())
         ]
-        top_set = session_df.loc[session_df["weight_kg"].idxmax()]
-        total_vol = (session_df["weight_kg"] * session_df["reps"]).sum()
+        top_pos = int(np.argmax(w))
+        total_vol = float((w * r).sum())
         
         sessions.append({
-            "date": str(date),
+            "date": str(pd.Timestamp(date).date()),
             "sets": sets_list,
             "sets_display": " → ".join(sets_list),
-            "top_set": f"{top_set['weight_kg']}kg x {int(top_set['reps'])}",
+            "top_set": f"{w[top_pos]}kg x {int(r[top_pos])}",
             "total_sets": len(session_df),
             "session_volume": round(total_vol, 1)
         })
@@ -264,11 +310,11 @@ def generate_exercise_summary(stats: dict) -> str:
     return ". ".join(parts) + "."
 
 
-def calculate_muscle_stats(muscle_df: pd.DataFrame, full_df: pd.DataFrame, muscle: str, weeks_tracked: float) -> dict:
+def calculate_muscle_stats(muscle_df: pd.DataFrame, overall_sets: int, muscle: str, weeks_tracked: float) -> dict:
     """Calculate comprehensive stats for a muscle group."""
     exercises = muscle_df["exercise_id"].unique().tolist()
     total_sets = len(muscle_df)
-    percentage = round(100 * total_sets / len(full_df), 1)
+    percentage = round(100 * total_sets / overall_sets, 1)
     weekly_avg = round(total_sets / weeks_tracked, 1)
     
     # Find dominant exercise
@@ -327,7 +373,7 @@ def get_recommended_sets(muscle: str) -> dict:
 def calculate_global_stats(df: pd.DataFrame, weeks_tracked: float) -> dict:
     """Calculate global training insights."""
     # Sessions per week
-    total_sessions = df["start_time"].dt.date.nunique()
+    total_sessions = df["session_date"].nunique()
     sessions_per_week = round(total_sessions / weeks_tracked, 1)
     
     # Push/Pull classification
@@ -335,21 +381,21 @@ def calculate_global_stats(df: pd.DataFrame, weeks_tracked: float) -> dict:
     pull_muscles = ["lats", "upper_back", "biceps", "forearms"]
     leg_muscles = ["quads", "hamstrings", "glutes"]
     
-    push_sets = len(df[df["primary_muscle"].isin(push_muscles)])
-    pull_sets = len(df[df["primary_muscle"].isin(pull_muscles)])
-    leg_sets = len(df[df["primary_muscle"].isin(leg_muscles)])
+    # Per-muscle set counts in one pass over the categorical codes
+    muscles = df["primary_muscle"].cat.categories
+    counts = np.bincount(df["primary_muscle"].cat.codes.to_numpy(), minlength=len(muscles))
+    push_sets = int(counts[muscles.isin(push_muscles)].sum())
+    pull_sets = int(counts[muscles.isin(pull_muscles)].sum())
+    leg_sets = int(counts[muscles.isin(leg_muscles)].sum())
     upper_sets = push_sets + pull_sets
     
     push_pull_ratio = round(push_sets / pull_sets, 2) if pull_sets > 0 else 0
     upper_lower_ratio = round(upper_sets / leg_sets, 2) if leg_sets > 0 else 0
     
     # Find undertrained muscles
-    muscle_weekly = df.groupby("primary_muscle").size() / weeks_tracked
-    undertrained = []
-    for muscle, weekly in muscle_weekly.items():
-        rec = get_recommended_sets(muscle)
-        if weekly < rec["min"]:
-            undertrained.append(muscle)
+    muscle_weekly = counts / weeks_tracked
+    min_sets = np.array([get_recommended_sets(m)["min"] for m in muscles])
+    undertrained = muscles[(counts > 0) & (muscle_weekly < min_sets)].tolist()
     
     # Overall trend (simplified - based on total volume trend)
     stats = {
@@ -377,6 +423,11 @@ def calculate_global_stats(df: pd.DataFrame, weeks_tracked: float) -> dict:
 
 
 def load_user_profile(path: str = "data/user_profile.json") -> dict:
-    """Load pre-computed profile from JSON."""
-    with open(path, "r") as f:
-        return json.load(f)
+    """Load pre-computed profile from JSON (cached until the file changes; treat as read-only)."""
+    return _load_user_profile_cached(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=8)
+def _load_user_profile_cached(path: str, mtime: float) -> dict:
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
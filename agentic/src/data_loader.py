@@ -1,32 +1,67 @@
 """CSV ingestion and normalization."""
+from typing import Optional
+
 import pandas as pd
-from .config import EXERCISE_MUSCLE_MAP, DATE_FORMAT
+from .config import EXERCISE_MUSCLE_MAP, EXERCISE_TITLE_ARR, EXERCISE_ID_ARR, PRIMARY_MUSCLE_ARR, DATE_FORMAT
+
+try:
+    import pyarrow  # noqa: F401
+    _CSV_ENGINE = "pyarrow"
+except ImportError:
+    # pyarrow not installed, use pandas' C parser
+    _CSV_ENGINE = "c"
+
+# Only the columns the analyzers read are parsed; the export carries several
+# free-text/optional fields (description, notes, rpe, ...) we never touch
+_CSV_COLUMNS = ["start_time", "end_time", "exercise_title", "set_index", "weight_kg", "reps"]
+
+# Declared up front so the parser skips type inference on the numeric columns
+_CSV_DTYPES = {"weight_kg": "float64", "reps": "float64"}
 
+# Title-indexed lookups so mapping runs as a hash join instead of a Python lambda per row
+_ID_SERIES = pd.Series(EXERCISE_ID_ARR, index=EXERCISE_TITLE_ARR)
+_MUSCLE_SERIES = pd.Series(PRIMARY_MUSCLE_ARR, index=EXERCISE_TITLE_ARR)
 
-def load_and_normalize_csv(filepath: str) -> pd.DataFrame:
-    """Load CSV, filter to supported exercises, add canonical columns."""
-    df = pd.read_csv(filepath)
+
+def load_and_normalize_csv(filepath: str, usecols: Optional[list[str]] = _CSV_COLUMNS) -> pd.DataFrame:
+    """Load CSV, filter to supported exercises, add canonical columns (usecols=None keeps every column)."""
+    df = pd.read_csv(filepath, engine=_CSV_ENGINE, usecols=usecols, dtype=_CSV_DTYPES)
     
     # Filter to supported exercises only
-    df = df[df["exercise_title"].isin(EXERCISE_MUSCLE_MAP.keys())].copy()
+    df = df[df["exercise_title"].isin(_ID_SERIES.index)].copy()
     
-    # Add canonical columns from mapping
-    df["exercise_id"] = df["exercise_title"].map(lambda x: EXERCISE_MUSCLE_MAP[x]["exercise_id"])
-    df["primary_muscle"] = df["exercise_title"].map(lambda x: EXERCISE_MUSCLE_MAP[x]["primary_muscle"])
+    # Add canonical columns from mapping: look up each distinct title once,
+    # then expand to rows through the categorical codes
+    titles = df["exercise_title"].astype("category")
+    codes = titles.cat.codes.to_numpy()
+    df["exercise_title"] = titles
+    df["exercise_id"] = titles.cat.categories.map(_ID_SERIES).to_numpy()[codes]
+    df["primary_muscle"] = titles.cat.categories.map(_MUSCLE_SERIES).to_numpy()[codes]
     
     # Parse dates
-    df["start_time"] = pd.to_datetime(df["start_time"], format=DATE_FORMAT)
-    df["end_time"] = pd.to_datetime(df["end_time"], format=DATE_FORMAT)
+    df["start_time"] = _parse_timestamps(df["start_time"])
+    df["end_time"] = _parse_timestamps(df["end_time"])
     
-    # Fill NaN
-    df["weight_kg"] = df["weight_kg"].fillna(0)
-    df["reps"] = df["reps"].fillna(0)
+    # Fill NaN in place on the (already copied) float64 numeric columns
+    df.fillna({"weight_kg": 0, "reps": 0}, inplace=True)
     
     return df
 
 
+def _parse_timestamps(values: pd.Series) -> pd.Series:
+    """Parse with the export's DATE_FORMAT, falling back to pandas' ISO 8601 fast path."""
+    # Every set in a session repeats the same timestamp string: parse each
+    # distinct string once, then scatter back (missing values become NaT)
+    codes, uniques = pd.factorize(values)
+    try:
+        parsed = pd.to_datetime(uniques, format=DATE_FORMAT)
+    except ValueError:
+        parsed = pd.to_datetime(uniques, format="ISO8601")
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index)
+
+
 def get_unsupported_exercises(filepath: str) -> list[str]:
     """Return exercises in CSV not in our mapping."""
-    df = pd.read_csv(filepath)
+    df = pd.read_csv(filepath, engine=_CSV_ENGINE, usecols=["exercise_title"])
     all_exercises = df["exercise_title"].unique()
     return [e for e in all_exercises if e not in EXERCISE_MUSCLE_MAP]
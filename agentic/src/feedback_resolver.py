@@ -1,6 +1,9 @@
 """Feedback resolution - LLM-based routine matching."""
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
-import json
+
+import orjson
 
 from .tracing import maybe_track, update_current_span
 
@@ -22,14 +25,41 @@ def _truncate(text: str, limit: int = 1800) -> str:
     return text[: limit - 3] + "..."
 
 
+# Serialized routine blobs keyed by routine id. Routines are insert-only, so a
+# given id always maps to the same content and the blob can be reused.
+_BLOB_CACHE_SIZE = 4096
+_blob_cache: "OrderedDict[str, str]" = OrderedDict()
+# Resolution runs in asyncio.to_thread workers; the LRU bookkeeping must not interleave
+_blob_cache_lock = threading.Lock()
+
+
+def _routine_blob(routine_id: Any, routine_json: Dict[str, Any]) -> str:
+    if routine_id is None:
+        return _truncate(orjson.dumps(routine_json).decode())
+    key = str(routine_id)
+    with _blob_cache_lock:
+        blob = _blob_cache.get(key)
+        if blob is not None:
+            _blob_cache.move_to_end(key)
+            return blob
+    blob = _truncate(orjson.dumps(routine_json).decode())
+    with _blob_cache_lock:
+        _blob_cache[key] = blob
+        if len(_blob_cache) > _BLOB_CACHE_SIZE:
+            _blob_cache.popitem(last=False)
+    return blob
+
+
 def _format_candidates(candidates: List[Dict[str, Any]]) -> str:
+    # Stable id order keeps the serialized block byte-identical across turns
+    ordered = sorted(candidates, key=lambda c: str(c.get("id", "")))
     lines = []
-    for idx, candidate in enumerate(candidates, 1):
+    for idx, candidate in enumerate(ordered, 1):
         routine_json = candidate.get("routine_json", {}) or {}
         title = routine_json.get("title", "Untitled Routine")
         last_mentioned = candidate.get("last_mentioned_at", "unknown date")
         routine_id = candidate.get("id", "unknown")
-        routine_blob = _truncate(json.dumps(routine_json, separators=(",", ":")))
+        routine_blob = _routine_blob(candidate.get("id"), routine_json)
         lines.append(
             f"{idx}. {title} {last_mentioned} ... {routine_blob} [{routine_id}]"
         )
@@ -75,22 +105,26 @@ def resolve_routine_for_feedback(
         or ""
     )
 
-    prompt = (
+    # Static instructions + routines first, the per-turn query last, so the
+    # shared prefix can be served from the provider's prompt cache
+    system_prompt = (
         f"{ROUTINE_RESOLUTION_PROMPT}\n\n"
-        f"Here is the user query:\n{user_query}\n\n"
         f"Here are the routines:\n{candidates_text}\n"
     )
 
     response = client.chat.completions.create(
         model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Here is the user query:\n{user_query}"}
+        ],
         temperature=0,
     )
 
     content = response.choices[0].message.content.strip()
     routine_id = None
     try:
-        parsed = json.loads(content)
+        parsed = orjson.loads(content)
         routine_id = parsed.get("routine_id")
     except Exception:
         routine_id = None
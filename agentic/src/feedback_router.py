@@ -5,15 +5,21 @@ DEPRECATED: This module is superseded by unified_classifier.py which combines
 feedback detection and intent classification in a single LLM call. This file
 is kept for backward compatibility.
 """
-import json
-from typing import Dict, Any, Optional, Callable
+import contextvars
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Tuple
+
+import orjson
 
 from .feedback_resolver import resolve_routine_for_feedback
 from .tracing import maybe_track, update_current_span, log_feedback_signals
-from .tracing_models import FeedbackDetectionResult, OutcomeExtraction, TargetSignals
 
 
-FEEDBACK_DETECTION_PROMPT = """Determine if the user's message contains feedback about a workout routine or training plan.
+FEEDBACK_ANALYSIS_PROMPT = """Analyze the user's message for feedback about a workout routine or training plan.
 
 Feedback includes:
 - Positive: "worked well", "loved it", "saw progress", "completed"
@@ -21,44 +27,144 @@ Feedback includes:
 - Injury/pain: "hurt my", "caused pain", "injured"
 - Abandonment: "stopped", "gave up", "abandoned"
 
-Respond with ONLY valid JSON:
-{"is_feedback": true | false}"""
-
-
-OUTCOME_EXTRACTION_PROMPT = """Extract the outcome from the user's feedback about a workout routine.
-
-Return JSON with:
-- outcome_type: "positive" | "negative" | "injury" | "abandoned"
-- outcome_text: Short verbatim description (max 200 chars)
-
-Examples:
-"too hard, couldn't complete sets" → {"outcome_type": "negative", "outcome_text": "too hard, couldn't complete sets"}
-"worked well, saw progress" → {"outcome_type": "positive", "outcome_text": "worked well, saw progress"}
-"hurt my shoulder" → {"outcome_type": "injury", "outcome_text": "hurt my shoulder"}
-
-Respond with ONLY valid JSON."""
-
-
-TARGET_SIGNAL_EXTRACTION_PROMPT = """Extract target signals from the user's feedback message.
-
-Return JSON with:
-- mentioned_muscles: List of muscle groups mentioned (e.g. ["chest", "shoulder"])
-- mentioned_exercises: List of exercises mentioned (optional, e.g. ["bench press"])
-- explicit_routine_refs: List of explicit routine references (e.g. ["chest routine", "leg routine"])
-- negations: List of negated targets (e.g. ["not the leg routine"])
+If the message is feedback, also extract:
+- outcome.outcome_type: "positive" | "negative" | "injury" | "abandoned"
+- outcome.outcome_text: Short verbatim description (max 200 chars)
+- target_signals.mentioned_muscles: Muscle groups mentioned (e.g. ["chest", "shoulder"])
+- target_signals.mentioned_exercises: Exercises mentioned (e.g. ["bench press"])
+- target_signals.explicit_routine_refs: Explicit routine references (e.g. ["chest routine"])
+- target_signals.negations: Negated targets (e.g. ["not the leg routine"])
 
 Examples:
 "the chest routine hurt my shoulder" → {
-  "mentioned_muscles": ["chest", "shoulder"],
-  "explicit_routine_refs": ["chest routine"]
-}
-"not the leg routine, the chest one" → {
-  "mentioned_muscles": ["leg", "chest"],
-  "explicit_routine_refs": ["chest routine"],
-  "negations": ["not the leg routine"]
+  "is_feedback": true,
+  "outcome": {"outcome_type": "injury", "outcome_text": "the chest routine hurt my shoulder"},
+  "target_signals": {
+    "mentioned_muscles": ["chest", "shoulder"],
+    "mentioned_exercises": [],
+    "explicit_routine_refs": ["chest routine"],
+    "negations": []
+  }
 }
-
-Respond with ONLY valid JSON."""
+"give me a leg day" → {"is_feedback": false}
+
+Respond with ONLY valid JSON. Set "outcome" and "target_signals" to null when is_feedback is false."""
+
+
+def _strict_schema(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap a JSON schema as a strict structured-output response_format."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+def _string_list() -> Dict[str, Any]:
+    return {"type": "array", "items": {"type": "string"}}
+
+
+_ANALYSIS_FORMAT = _strict_schema("feedback_analysis", {
+    "type": "object",
+    "properties": {
+        "is_feedback": {"type": "boolean"},
+        "outcome": {"anyOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "outcome_type": {"type": "string", "enum": ["positive", "negative", "injury", "abandoned"]},
+                    "outcome_text": {"type": "string"},
+                },
+                "required": ["outcome_type", "outcome_text"],
+                "additionalProperties": False,
+            },
+            {"type": "null"},
+        ]},
+        "target_signals": {"anyOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "mentioned_muscles": _string_list(),
+                    "mentioned_exercises": _string_list(),
+                    "explicit_routine_refs": _string_list(),
+                    "negations": _string_list(),
+                },
+                "required": ["mentioned_muscles", "mentioned_exercises", "explicit_routine_refs", "negations"],
+                "additionalProperties": False,
+            },
+            {"type": "null"},
+        ]},
+    },
+    "required": ["is_feedback", "outcome", "target_signals"],
+    "additionalProperties": False,
+})
+
+
+def _keyword_pattern(keywords, overlapping: bool = False) -> "re.Pattern[str]":
+    """Compile substring keywords into a single alternation, longest first."""
+    alternation = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    if overlapping:
+        # Lookahead capture reports every start position, so adjacent
+        # keywords that share characters are all found.
+        return re.compile(f"(?=({alternation}))")
+    return re.compile(alternation)
+
+
+_FALLBACK_MUSCLES = ["chest", "shoulder", "bicep", "tricep", "back", "leg", "quad", "hamstring"]
+_FEEDBACK_KEYWORD_RE = _keyword_pattern([
+    "too hard", "worked well", "didn't like", "completed", "stopped",
+    "hurt", "injury", "pain", "abandoned", "finished", "loved", "hated"
+])
+_INJURY_RE = _keyword_pattern(["hurt", "injury", "pain", "injured"])
+_ABANDONED_RE = _keyword_pattern(["stopped", "abandoned", "gave up"])
+_POSITIVE_RE = _keyword_pattern(["worked", "loved", "great", "good", "completed"])
+_MUSCLE_KEYWORD_RE = _keyword_pattern(_FALLBACK_MUSCLES, overlapping=True)
+
+# Broad, recall-oriented vocabulary: messages with none of these stems are
+# not sent to the LLM for feedback analysis at all
+_FEEDBACK_PREFILTER_RE = re.compile(
+    r"\b(?:too (?:hard|easy|much)|work(?:ed|s)|lov(?:ed|e)|hat(?:ed|e)|hurt|pain|"
+    r"injur|sore|abandon|stopped|quit|gave up|complet|finish|didn'?t like|"
+    r"progress|effective|enjoy|boring|difficult)",
+    re.IGNORECASE,
+)
+
+
+# Combined (is_feedback, outcome, target_signals) per normalized message, so a
+# repeated message skips the LLM call. Only clean LLM results are stored.
+_FEEDBACK_CACHE_SIZE = 1024
+_feedback_cache: "OrderedDict[str, Tuple[bool, Optional[Dict[str, str]], Optional[Dict[str, Any]]]]" = OrderedDict()
+_feedback_cache_lock = threading.Lock()
+
+
+# Background pool for the candidate fetch, which overlaps the analysis call
+_candidate_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="feedback-candidates")
+
+
+def _might_be_feedback(message: str) -> bool:
+    return _FEEDBACK_PREFILTER_RE.search(message) is not None
+
+
+def _feedback_cache_key(message: str) -> str:
+    # Digest of the whitespace/case-normalized text keeps keys small no
+    # matter how long the message is
+    normalized = " ".join(message.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _get_cached_feedback(key: str):
+    with _feedback_cache_lock:
+        entry = _feedback_cache.get(key)
+        if entry is not None:
+            _feedback_cache.move_to_end(key)
+        return entry
+
+
+def _cache_feedback(key: str, entry) -> None:
+    with _feedback_cache_lock:
+        _feedback_cache[key] = entry
+        _feedback_cache.move_to_end(key)
+        if len(_feedback_cache) > _FEEDBACK_CACHE_SIZE:
+            _feedback_cache.popitem(last=False)
 
 
 @maybe_track(name="feedback_turn")
@@ -78,8 +184,30 @@ def run_feedback_turn(
     - {"type": "resolved", "routine_id": str, "outcome_type": str, "outcome_text": str}
     - {"type": "clarification", "candidates": List[Dict]} - ambiguous, needs clarification
     """
-    # Detect feedback
-    is_feedback, detection_method = _detect_feedback(message, client)
+    cache_key = _feedback_cache_key(message) if client is not None else None
+    cached = _get_cached_feedback(cache_key) if cache_key else None
+
+    # Detect feedback and extract outcome + target signals
+    pending_candidates = None
+    if cached is not None:
+        is_feedback, outcome, target_signals = cached
+        detection_method = "cache"
+    else:
+        if client is not None and _might_be_feedback(message):
+            # Start the DB round trip now so it runs behind the LLM call;
+            # the result is simply dropped if the message is not feedback
+            # Copied context so tracing spans in the fetch attach to this turn
+            ctx = contextvars.copy_context()
+            pending_candidates = _candidate_executor.submit(
+                ctx.run, get_routine_candidates, user_id, days_back=60
+            )
+        is_feedback, outcome, target_signals, detection_method = _analyze_feedback(message, client)
+        if cache_key and detection_method == "llm":
+            _cache_feedback(cache_key, (
+                is_feedback,
+                dict(outcome) if outcome else None,
+                dict(target_signals) if target_signals else None,
+            ))
 
     # Log detection result
     log_feedback_signals(is_feedback)
@@ -93,9 +221,9 @@ def run_feedback_turn(
     if not is_feedback:
         return {"type": "ignore"}
 
-    # Extract outcome and target signals
-    outcome, outcome_method = _extract_outcome(message, client)
-    target_signals, signals_method = _extract_target_signals(message, client)
+    outcome = dict(outcome)
+    target_signals = dict(target_signals)
+    outcome_method = signals_method = detection_method
 
     # Log extraction results
     log_feedback_signals(
@@ -117,7 +245,10 @@ def run_feedback_turn(
     })
 
     # Get candidates and resolve
-    candidates = get_routine_candidates(user_id, days_back=60)
+    if pending_candidates is not None:
+        candidates = pending_candidates.result()
+    else:
+        candidates = get_routine_candidates(user_id, days_back=60)
 
     update_current_span(metadata={
         "candidates_fetched": len(candidates) if candidates else 0
@@ -153,125 +284,87 @@ def run_feedback_turn(
     return {"type": "ignore"}
 
 
-@maybe_track(name="detect_feedback")
-def _detect_feedback(message: str, client) -> tuple[bool, str]:
+@maybe_track(name="analyze_feedback")
+def _analyze_feedback(message: str, client) -> tuple[bool, Optional[Dict[str, str]], Optional[Dict[str, Any]], str]:
     """
-    Detect if message contains feedback.
+    Detect feedback and extract outcome and target signals in one LLM call.
 
     Returns:
-        Tuple of (is_feedback, detection_method)
+        Tuple of (is_feedback, outcome_dict, signals_dict, method); the two
+        dicts are None when the message is not feedback.
     """
     if client is None:
-        keywords = [
-            "too hard", "worked well", "didn't like", "completed", "stopped",
-            "hurt", "injury", "pain", "abandoned", "finished", "loved", "hated"
-        ]
-        is_feedback = any(keyword in message.lower() for keyword in keywords)
-        return is_feedback, "keyword"
+        if not _detect_feedback(message):
+            return False, None, None, "keyword"
+        return True, _extract_outcome(message), _extract_target_signals(message), "keyword"
+
+    if not _might_be_feedback(message):
+        return False, None, None, "regex_prefilter"
 
     try:
         response = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": FEEDBACK_DETECTION_PROMPT},
+                {"role": "system", "content": FEEDBACK_ANALYSIS_PROMPT},
                 {"role": "user", "content": message}
             ],
-            max_tokens=50,
-            response_format={"type": "json_object"}
+            max_tokens=200,
+            response_format=_ANALYSIS_FORMAT
         )
-        result = json.loads(response.choices[0].message.content.strip())
-        return result.get("is_feedback", False), "llm"
+        result = orjson.loads(response.choices[0].message.content.strip())
     except Exception:
-        return False, "llm_error"
+        return False, None, None, "llm_error"
 
+    if not result.get("is_feedback", False):
+        return False, None, None, "llm"
 
-@maybe_track(name="extract_outcome")
-def _extract_outcome(message: str, client) -> tuple[Dict[str, str], str]:
-    """
-    Extract outcome type and text.
+    outcome = result.get("outcome") or {}
+    signals = result.get("target_signals") or {}
+    return True, {
+        "outcome_type": outcome.get("outcome_type", "negative"),
+        "outcome_text": outcome.get("outcome_text", message[:200])
+    }, {
+        "mentioned_muscles": signals.get("mentioned_muscles", []),
+        "mentioned_exercises": signals.get("mentioned_exercises", []),
+        "explicit_routine_refs": signals.get("explicit_routine_refs", []),
+        "negations": signals.get("negations", [])
+    }, "llm"
 
-    Returns:
-        Tuple of (outcome_dict, extraction_method)
-    """
-    if client is None:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["hurt", "injury", "pain", "injured"]):
-            outcome_type = "injury"
-        elif any(word in message_lower for word in ["stopped", "abandoned", "gave up"]):
-            outcome_type = "abandoned"
-        elif any(word in message_lower for word in ["worked", "loved", "great", "good", "completed"]):
-            outcome_type = "positive"
-        else:
-            outcome_type = "negative"
 
-        return {
-            "outcome_type": outcome_type,
-            "outcome_text": message[:200]
-        }, "keyword"
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": OUTCOME_EXTRACTION_PROMPT},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=150,
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content.strip())
-        return {
-            "outcome_type": result.get("outcome_type", "negative"),
-            "outcome_text": result.get("outcome_text", message[:200])
-        }, "llm"
-    except Exception:
-        return {
-            "outcome_type": "negative",
-            "outcome_text": message[:200]
-        }, "llm_error"
+@maybe_track(name="detect_feedback")
+def _detect_feedback(message: str) -> bool:
+    """Keyword-based feedback detection, used when no LLM client is available."""
+    return _FEEDBACK_KEYWORD_RE.search(message.lower()) is not None
 
 
-@maybe_track(name="extract_target_signals")
-def _extract_target_signals(message: str, client) -> tuple[Dict[str, Any], str]:
-    """
-    Extract target signals (muscles, exercises, refs, negations).
-
-    Returns:
-        Tuple of (signals_dict, extraction_method)
-    """
-    if client is None:
-        message_lower = message.lower()
-        muscles = ["chest", "shoulder", "bicep", "tricep", "back", "leg", "quad", "hamstring"]
-        mentioned_muscles = [m for m in muscles if m in message_lower]
+@maybe_track(name="extract_outcome")
+def _extract_outcome(message: str) -> Dict[str, str]:
+    """Keyword-based outcome type and text."""
+    message_lower = message.lower()
+    if _INJURY_RE.search(message_lower):
+        outcome_type = "injury"
+    elif _ABANDONED_RE.search(message_lower):
+        outcome_type = "abandoned"
+    elif _POSITIVE_RE.search(message_lower):
+        outcome_type = "positive"
+    else:
+        outcome_type = "negative"
+
+    return {
+        "outcome_type": outcome_type,
+        "outcome_text": message[:200]
+    }
 
-        return {
-            "mentioned_muscles": mentioned_muscles,
-            "mentioned_exercises": [],
-            "explicit_routine_refs": [],
-            "negations": []
-        }, "keyword"
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": TARGET_SIGNAL_EXTRACTION_PROMPT},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=200,
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content.strip())
-        return {
-            "mentioned_muscles": result.get("mentioned_muscles", []),
-            "mentioned_exercises": result.get("mentioned_exercises", []),
-            "explicit_routine_refs": result.get("explicit_routine_refs", []),
-            "negations": result.get("negations", [])
-        }, "llm"
-    except Exception:
-        return {
-            "mentioned_muscles": [],
-            "mentioned_exercises": [],
-            "explicit_routine_refs": [],
-            "negations": []
-        }, "llm_error"
+@maybe_track(name="extract_target_signals")
+def _extract_target_signals(message: str) -> Dict[str, Any]:
+    """Keyword-based target signals (muscles only)."""
+    found = set(_MUSCLE_KEYWORD_RE.findall(message.lower()))
+    mentioned_muscles = [m for m in _FALLBACK_MUSCLES if m in found]
+
+    return {
+        "mentioned_muscles": mentioned_muscles,
+        "mentioned_exercises": [],
+        "explicit_routine_refs": [],
+        "negations": []
+    }
@@ -5,13 +5,31 @@ DEPRECATED: This module is superseded by unified_classifier.py which combines
 intent classification and feedback detection in a single LLM call. This file
 is kept for backward compatibility with CLI mode (main_chat.py).
 """
-import json
-from typing import Tuple
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
 
 from .config import Intent
+from .intent_setfit import predict_intent
+from .llm_client import CLASSIFICATION_TIMEOUT, get_fast_client, llm_breaker
 from .tracing import maybe_track, update_current_span, log_intent_classification
 
 
+# Classification is a pure function of the query text, so results are
+# memoized per normalized query
+_INTENT_CACHE_SIZE = 4096
+_intent_cache: "OrderedDict[str, str]" = OrderedDict()
+# Shared by backend worker threads and batch runs
+_intent_cache_lock = threading.Lock()
+
+# Case-insensitive label check on the raw reply, no strip()/upper() copies
+_ROUTINE_LABEL_RE = re.compile(Intent.ROUTINE_GENERATION, re.IGNORECASE)
+
+# Low-latency model served by Groq, used for classification when enabled
+FAST_CLASSIFICATION_MODEL = "llama-3.1-8b-instant"
+
+
 INTENT_PROMPT = """Classify the user's fitness query into one of the following intents:
 
 ROUTINE_GENERATION
@@ -38,6 +56,17 @@ ROUTINE_GENERATION or REASONING
 """
 
 
+# Same label set, many queries per request (offline replay / eval runs)
+BATCH_INTENT_PROMPT = INTENT_PROMPT.rsplit("Respond with", 1)[0] + """You will receive several numbered queries, one per line.
+Respond with one line per query, in order, formatted as "<number>. <LABEL>":
+1. ROUTINE_GENERATION
+2. REASONING
+"""
+
+_BATCH_LINE_RE = re.compile(r"^\s*(\d+)\s*[.):-]\s*(ROUTINE_GENERATION|REASONING)", re.IGNORECASE | re.MULTILINE)
+_BATCH_CHUNK_SIZE = 50
+
+
 @maybe_track(name="classify_intent")
 def classify_intent(query: str, client=None) -> Tuple[str, str]:
     """
@@ -55,28 +84,50 @@ def classify_intent(query: str, client=None) -> Tuple[str, str]:
         })
         return intent, "keyword"
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": INTENT_PROMPT},
-                {"role": "user", "content": query}
-            ],
-            max_tokens=25
-        )
+    cache_key = " ".join(query.lower().split())
+    intent = _get_cached_intent(cache_key)
+    if intent is not None:
+        log_intent_classification(intent)
+        update_current_span(metadata={
+            "intent": intent,
+            "classification_method": "cache"
+        })
+        return intent, "cache"
+
+    # Confident local prediction skips the LLM round trip entirely
+    intent = predict_intent(query, INTENT_PROMPT)
+    if intent is not None:
+        log_intent_classification(intent)
+        update_current_span(metadata={
+            "intent": intent,
+            "classification_method": "embedding"
+        })
+        return intent, "embedding"
+
+    if not llm_breaker.allow():
+        intent = _classify_mock(query)
+        update_current_span(metadata={
+            "intent": intent,
+            "classification_method": "circuit_open"
+        })
+        return intent, "circuit_open"
 
-        result = response.choices[0].message.content.strip().upper()
-        intent = Intent.ROUTINE_GENERATION if "ROUTINE_GENERATION" in result else Intent.REASONING
+    try:
+        result, method = _request_label(query, client)
+        llm_breaker.record_success()
+        intent = Intent.ROUTINE_GENERATION if _ROUTINE_LABEL_RE.search(result) else Intent.REASONING
 
         log_intent_classification(intent)
         update_current_span(metadata={
             "intent": intent,
-            "classification_method": "llm",
+            "classification_method": method,
             "raw_response": result
         })
 
-        return intent, "llm"
+        _cache_intent(cache_key, intent)
+        return intent, method
     except Exception as e:
+        llm_breaker.record_failure()
         intent = _classify_mock(query)
         update_current_span(metadata={
             "intent": intent,
@@ -86,9 +137,114 @@ def classify_intent(query: str, client=None) -> Tuple[str, str]:
         return intent, "llm_error"
 
 
+def _get_cached_intent(key: str):
+    with _intent_cache_lock:
+        # pop + re-insert marks it most recent without a separate KeyError-prone lookup
+        intent = _intent_cache.pop(key, None)
+        if intent is not None:
+            _intent_cache[key] = intent
+        return intent
+
+
+def _cache_intent(key: str, intent: str) -> None:
+    with _intent_cache_lock:
+        _intent_cache[key] = intent
+        if len(_intent_cache) > _INTENT_CACHE_SIZE:
+            _intent_cache.popitem(last=False)
+
+
+def _request_label(query: str, client) -> Tuple[str, str]:
+    """Ask for the intent label, preferring the Groq backend and falling back to OpenAI."""
+    fast_client = get_fast_client()
+    if fast_client is not None:
+        try:
+            return _complete_label(fast_client, FAST_CLASSIFICATION_MODEL, query), "groq"
+        except Exception:
+            pass
+    return _complete_label(client, "gpt-4o-mini", query), "llm"
+
+
+def _complete_label(client, model: str, query: str) -> str:
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": INTENT_PROMPT},
+            {"role": "user", "content": query}
+        ],
+        max_tokens=25,
+        timeout=CLASSIFICATION_TIMEOUT
+    )
+    return response.choices[0].message.content
+
+
 def _classify_mock(query: str) -> str:
     """Fallback keyword-based classification."""
     data_keywords = ["show", "list", "see", "display", "what did", "history"]
-    if any(kw in query.lower() for kw in data_keywords):
+    q = query.lower()
+    if any(kw in q for kw in data_keywords):
         return Intent.ROUTINE_GENERATION
     return Intent.REASONING
+
+
+@maybe_track(name="classify_intents_batch")
+def classify_intents_batch(queries: List[str], client=None) -> List[str]:
+    """
+    Classify many independent queries, one LLM call per chunk of 50.
+
+    Cached queries are answered locally; anything the model does not label
+    (or a failed chunk) falls back to keyword classification.
+    """
+    if client is None:
+        return [_classify_mock(q) for q in queries]
+
+    keys = [" ".join(q.lower().split()) for q in queries]
+    with _intent_cache_lock:
+        intents = [_intent_cache.get(key) for key in keys]
+    pending = [i for i, intent in enumerate(intents) if intent is None]
+
+    for start in range(0, len(pending), _BATCH_CHUNK_SIZE):
+        chunk = pending[start:start + _BATCH_CHUNK_SIZE]
+        labels = _classify_chunk([queries[i] for i in chunk], client)
+        for offset, i in enumerate(chunk, 1):
+            intent = labels.get(offset)
+            if intent is None:
+                intents[i] = _classify_mock(queries[i])
+            else:
+                intents[i] = intent
+                _cache_intent(keys[i], intent)
+
+    update_current_span(metadata={
+        "queries_count": len(queries),
+        "llm_classified": len(pending)
+    })
+    return intents
+
+
+def _classify_chunk(chunk: List[str], client) -> dict:
+    """Return {1-based position: intent} for the labels parsed from one batched reply."""
+    if not llm_breaker.allow():
+        return {}
+
+    # One query per line, so embedded newlines are collapsed
+    numbered = "\n".join(f"{i}. {' '.join(q.split())}" for i, q in enumerate(chunk, 1))
+    try:
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": BATCH_INTENT_PROMPT},
+                {"role": "user", "content": numbered}
+            ],
+            max_tokens=8 * len(chunk) + 16,
+            timeout=CLASSIFICATION_TIMEOUT * 2
+        )
+        llm_breaker.record_success()
+    except Exception:
+        llm_breaker.record_failure()
+        return {}
+
+    labels = {}
+    for match in _BATCH_LINE_RE.finditer(response.choices[0].message.content or ""):
+        labels[int(match.group(1))] = (
+            Intent.ROUTINE_GENERATION if match.group(2).upper() == Intent.ROUTINE_GENERATION else Intent.REASONING
+        )
+    return labels
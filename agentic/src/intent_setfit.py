@@ -0,0 +1,168 @@
+"""Local embedding classifier for intent, consulted before the LLM.
+
+Queries are embedded with a small sentence-transformers model and scored by a
+logistic-regression head fitted on the example queries in INTENT_PROMPT. The
+fitted head is saved under INTENT_MODEL_CACHE_DIR (default .model_cache/ at the
+repo root), named after a hash of the model and training examples, so editing
+the prompt refits it. Loading happens in a background thread (warm_up()); until
+it finishes predict_intent() / embed_query() return None.
+
+Optional (not in requirements.txt): when sentence-transformers / scikit-learn
+are not installed (or the model cannot be loaded) predict_intent() returns None
+and callers use the LLM.
+"""
+import hashlib
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from .config import Intent
+
+try:
+    import joblib
+    from sentence_transformers import SentenceTransformer
+    from sklearn.linear_model import LogisticRegression
+    _EMBEDDING_AVAILABLE = True
+except ImportError:
+    # Optional dependencies missing, always defer to the LLM
+    _EMBEDDING_AVAILABLE = False
+
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".model_cache"
+)
+CONFIDENCE_THRESHOLD = 0.7
+
+_model = None
+_classifier = None
+_load_failed = False
+_encoder_failed = False
+_encoder_requested = False
+_classifier_requested = False
+# _lock only guards the flags above and is never held while loading;
+# _load_lock serializes the background loaders themselves
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+
+
+def parse_prompt_examples(prompt: str) -> List[Tuple[str, str]]:
+    """Extract (text, label) pairs from the quoted examples under each intent heading."""
+    labels = {Intent.ROUTINE_GENERATION, Intent.REASONING}
+    examples = []
+    label = None
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line in labels:
+            label = line
+        elif label and len(line) > 1 and line.startswith('"') and line.endswith('"'):
+            examples.append((line[1:-1], label))
+    return examples
+
+
+def _classifier_path(examples: List[Tuple[str, str]]) -> str:
+    """Artifact path keyed on the encoder and the exact training examples."""
+    h = hashlib.blake2b(MODEL_NAME.encode(), digest_size=8)
+    for text, label in examples:
+        h.update(b"\0" + text.encode() + b"\0" + label.encode())
+    cache_dir = os.getenv("INTENT_MODEL_CACHE_DIR") or DEFAULT_CACHE_DIR
+    return os.path.join(cache_dir, f"intent_clf-{h.hexdigest()}.joblib")
+
+
+def warm_up(training_prompt: Optional[str] = None) -> None:
+    """
+    Start loading the encoder (and fitting the head for training_prompt) in the
+    background. Returns immediately; safe to call repeatedly.
+    """
+    global _encoder_requested, _classifier_requested
+
+    if not _EMBEDDING_AVAILABLE:
+        return
+    with _lock:
+        load_encoder = not _encoder_requested
+        fit_classifier = training_prompt is not None and not _classifier_requested
+        _encoder_requested = True
+        if fit_classifier:
+            _classifier_requested = True
+    if load_encoder or fit_classifier:
+        threading.Thread(
+            target=_background_load,
+            args=(training_prompt if fit_classifier else None,),
+            name="intent-encoder-load",
+            daemon=True
+        ).start()
+
+
+def _background_load(training_prompt: Optional[str]) -> None:
+    global _model, _classifier, _encoder_failed, _load_failed
+
+    with _load_lock:
+        model = _model
+        if model is None and not _encoder_failed:
+            try:
+                model = SentenceTransformer(MODEL_NAME)
+            except Exception:
+                _encoder_failed = True
+                _load_failed = True
+                return
+            _model = model
+        if training_prompt is None or _classifier is not None or _load_failed or model is None:
+            return
+        try:
+            _classifier = _fit_or_load_classifier(model, training_prompt)
+        except Exception:
+            _load_failed = True
+
+
+def _fit_or_load_classifier(model, training_prompt: str):
+    """Load the persisted head for these examples, fitting and saving it on a miss."""
+    examples = parse_prompt_examples(training_prompt)
+    path = _classifier_path(examples)
+    if os.path.exists(path):
+        return joblib.load(path)
+    texts, labels = zip(*examples)
+    embeddings = model.encode(list(texts), normalize_embeddings=True)
+    classifier = LogisticRegression(max_iter=1000).fit(embeddings, labels)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(classifier, path)
+    except OSError:
+        # Read-only filesystem: keep the in-memory head only
+        pass
+    return classifier
+
+
+def embed_query(query: str):
+    """
+    Embed a query with the shared encoder.
+
+    Returns:
+        Unit-normalized embedding vector, or None while the encoder is
+        loading or when it is unavailable.
+    """
+    model = _model
+    if model is None:
+        warm_up()
+        return None
+    return model.encode([query], normalize_embeddings=True)[0]
+
+
+def predict_intent(query: str, training_prompt: str) -> Optional[str]:
+    """
+    Classify a query locally.
+
+    Returns:
+        The intent label when the classifier is confident, otherwise None
+        (also while the classifier is still loading).
+    """
+    model, classifier = _model, _classifier
+    if model is None or classifier is None:
+        warm_up(training_prompt)
+        return None
+
+    embedding = model.encode([query], normalize_embeddings=True)
+    probabilities = classifier.predict_proba(embedding)[0]
+    best = probabilities.argmax()
+    if probabilities[best] < CONFIDENCE_THRESHOLD:
+        return None
+    return str(classifier.classes_[best])
@@ -9,11 +9,23 @@ Usage:
     client = get_client()
     # All calls through this client are automatically traced when Opik is enabled
 """
+import logging
 import os
+import threading
+import time
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
+_TRUTHY = frozenset({"1", "true", "yes"})
+
+# Guards first-time construction so concurrent cold starts build (and
+# Opik-wrap) exactly one client
+_lock = threading.Lock()
 _client = None
 _initialized = False
+_fast_client = None
+_fast_initialized = False
 
 
 def get_client(api_key: Optional[str] = None):
@@ -36,43 +48,234 @@ def get_client(api_key: Optional[str] = None):
     if _initialized:
         return _client
 
-    # Get API key from parameter or environment
-    key = api_key or os.getenv("OPENAI_API_KEY")
+    with _lock:
+        if _initialized:
+            return _client
 
-    if not key:
+        # Get API key from parameter or environment
+        key = api_key or os.getenv("OPENAI_API_KEY")
+
+        if not key:
+            _client = None
+            _initialized = True
+            return None
+
+        # Create base OpenAI client. The SDK retries 429s and 5xx with
+        # exponential backoff; OPENAI_MAX_RETRIES raises the attempt count.
+        from openai import OpenAI
+        client = OpenAI(api_key=key, max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")))
+
+        # Wrap with Opik if enabled
+        if is_opik_enabled():
+            try:
+                from opik.integrations.openai import track_openai
+
+                # Set default project name if not already set
+                if not os.getenv("OPIK_PROJECT_NAME"):
+                    os.environ["OPIK_PROJECT_NAME"] = "Repsense"
+
+                client = track_openai(client)
+            except ImportError:
+                # Opik not installed, continue without instrumentation
+                pass
+
+        limiter = _create_rate_limiter()
+        if limiter is not None:
+            client.chat.completions = _RateLimitedCompletions(client.chat.completions, limiter)
+
+        # Publish the fully built client before flipping the flag
+        _client = client
         _initialized = True
-        _client = None
+        return _client
+
+
+def get_fast_client():
+    """
+    Get the singleton Groq client used for short classification calls.
+
+    Only enabled when USE_GROQ_FOR_CLASSIFICATION=1 and GROQ_API_KEY is set;
+    unset the flag to roll back to OpenAI for everything.
+
+    Returns:
+        Groq client instance, or None if disabled, unconfigured or not installed.
+    """
+    global _fast_client, _fast_initialized
+
+    if _fast_initialized:
+        return _fast_client
+
+    with _lock:
+        if _fast_initialized:
+            return _fast_client
+
+        _fast_client = _create_fast_client()
+        _fast_initialized = True
+        return _fast_client
+
+
+def _create_fast_client():
+    if os.getenv("USE_GROQ_FOR_CLASSIFICATION", "").lower() not in _TRUTHY:
+        return None
+
+    key = os.getenv("GROQ_API_KEY")
+    if not key:
+        return None
+
+    try:
+        from groq import Groq
+    except ImportError:
+        # groq not installed, classification stays on OpenAI
+        return None
+
+    return Groq(api_key=key)
+
+
+def is_groq_available() -> bool:
+    """Check if the Groq classification backend is enabled and configured."""
+    return get_fast_client() is not None
+
+
+# Per-call timeouts (seconds). Transient failures are already retried with
+# exponential backoff by the OpenAI SDK (max_retries=2).
+CLASSIFICATION_TIMEOUT = 5.0
+ADVICE_TIMEOUT = 20.0
+ROUTINE_TIMEOUT = 45.0
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing provider for a while.
+
+    After fail_max consecutive failures the breaker opens and allow() returns
+    False for reset_timeout seconds, so callers go straight to their fallback
+    instead of waiting out a timeout every turn. The next call after that is a
+    trial: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, fail_max: int = 3, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+
+# Shared by every OpenAI call site
+llm_breaker = CircuitBreaker()
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per minute, shared across threads.
+
+    acquire() blocks until the request fits under both limits, so concurrent
+    callers (backend worker threads, batch_run_chat_turns) run as fast as the
+    account allows without tripping 429s.
+    """
+
+    def __init__(self, max_requests_per_minute: float, max_tokens_per_minute: Optional[float] = None):
+        self.max_requests = max_requests_per_minute
+        self.max_tokens = max_tokens_per_minute
+        self._requests = max_requests_per_minute
+        self._tokens = max_tokens_per_minute or 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        if self.max_tokens:
+            # A single oversized request must still be able to go through
+            tokens = min(tokens, self.max_tokens)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                self._requests = min(self.max_requests, self._requests + elapsed * self.max_requests / 60)
+                if self.max_tokens:
+                    self._tokens = min(self.max_tokens, self._tokens + elapsed * self.max_tokens / 60)
+
+                wait = (1 - self._requests) * 60 / self.max_requests if self._requests < 1 else 0.0
+                if self.max_tokens and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.max_tokens)
+                if wait <= 0:
+                    self._requests -= 1
+                    if self.max_tokens:
+                        self._tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
+def _positive_env(name: str) -> Optional[float]:
+    """Read a positive number from the environment; None (with a warning) when invalid."""
+    raw = os.getenv(name)
+    if not raw:
         return None
+    try:
+        value = float(raw)
+    except ValueError:
+        value = 0.0
+    if not value > 0 or value == float("inf"):
+        logger.warning("Ignoring %s=%r: expected a positive number", name, raw)
+        return None
+    return value
+
+
+def _create_rate_limiter() -> Optional[RateLimiter]:
+    """Build the limiter from OPENAI_MAX_RPM / OPENAI_MAX_TPM; None when unset or invalid."""
+    rpm = _positive_env("OPENAI_MAX_RPM")
+    if rpm is None:
+        return None
+    return RateLimiter(rpm, _positive_env("OPENAI_MAX_TPM"))
 
-    # Create base OpenAI client
-    from openai import OpenAI
-    _client = OpenAI(api_key=key)
 
-    # Wrap with Opik if enabled
-    if os.getenv("OPIK_ENABLED", "").lower() in ("1", "true", "yes"):
-        try:
-            from opik.integrations.openai import track_openai
+def _estimate_tokens(kwargs: dict) -> int:
+    """Rough request cost: ~4 chars per prompt token plus the completion budget."""
+    prompt_chars = sum(len(m.get("content") or "") for m in kwargs.get("messages", ()))
+    return prompt_chars // 4 + (kwargs.get("max_tokens") or 0)
 
-            # Set default project name if not already set
-            if not os.getenv("OPIK_PROJECT_NAME"):
-                os.environ["OPIK_PROJECT_NAME"] = "Repsense"
 
-            _client = track_openai(_client)
-        except ImportError:
-            # Opik not installed, continue without instrumentation
-            pass
+class _RateLimitedCompletions:
+    """Wraps client.chat.completions so every create() call waits on the limiter."""
 
-    _initialized = True
-    return _client
+    def __init__(self, completions, limiter: RateLimiter):
+        self._completions = completions
+        self._limiter = limiter
+
+    def create(self, **kwargs):
+        self._limiter.acquire(_estimate_tokens(kwargs))
+        return self._completions.create(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
 
 
 def reset_client():
-    """Reset the client singleton (useful for testing)."""
-    global _client, _initialized
-    _client = None
-    _initialized = False
+    """Reset the client singletons (useful for testing)."""
+    global _client, _initialized, _fast_client, _fast_initialized
+    with _lock:
+        _client = None
+        _initialized = False
+        _fast_client = None
+        _fast_initialized = False
 
 
 def is_opik_enabled() -> bool:
     """Check if Opik instrumentation is enabled."""
-    return os.getenv("OPIK_ENABLED", "").lower() in ("1", "true", "yes")
+    return os.getenv("OPIK_ENABLED", "").lower() in _TRUTHY
@@ -1,11 +1,13 @@
 """Main entry point for the Fitness Data Assistant."""
-import os
+import asyncio
+import sys
 from dotenv import load_dotenv
-import pandas as pd
-import json
-from typing import Optional, List, Dict, Any
+from typing import IO, Optional, List, Dict, Any, Tuple
 
 from .router import handle_user_query
+from .intent_classifier import INTENT_PROMPT, classify_intents_batch
+from .intent_setfit import warm_up
+from .data_analyzer import load_user_profile
 from .llm_client import get_client
 from .tracing import maybe_track
 
@@ -16,9 +18,46 @@ def run_chat_turn(
     profile: dict,
     client=None,
     override_intent: Optional[str] = None,
-    episodes: Optional[List[Dict[str, Any]]] = None
+    episodes: Optional[List[Dict[str, Any]]] = None,
+    query_params: Optional[Dict[str, Any]] = None,
+    stream_to: Optional[IO[str]] = None
 ) -> dict:
-    return handle_user_query(query, profile, client, override_intent=override_intent, episodes=episodes)
+    return handle_user_query(
+        query, profile, client,
+        override_intent=override_intent, episodes=episodes, query_params=query_params,
+        stream_to=stream_to
+    )
+
+
+async def run_chat_turn_async(query: str, profile: dict, client=None, **kwargs) -> dict:
+    """Run a chat turn in a worker thread so the event loop stays free during LLM calls."""
+    return await asyncio.to_thread(run_chat_turn, query, profile, client, **kwargs)
+
+
+async def batch_run_chat_turns(
+    turns: List[Tuple[str, dict]],
+    client=None,
+    max_concurrency: int = 16
+) -> list:
+    """
+    Run independent (query, profile) turns concurrently.
+
+    Intents for all turns are classified up front in batched requests, then
+    the turns run with concurrency capped to stay within provider rate
+    limits. Results are returned in input order; a failed turn yields its
+    exception instead.
+    """
+    intents = await asyncio.to_thread(classify_intents_batch, [q for q, _ in turns], client)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run(query: str, profile: dict, intent: str) -> dict:
+        async with semaphore:
+            return await run_chat_turn_async(query, profile, client, override_intent=intent)
+
+    return await asyncio.gather(
+        *(_run(q, p, intent) for (q, p), intent in zip(turns, intents)),
+        return_exceptions=True
+    )
 
 
 def main():
@@ -27,14 +66,14 @@ def main():
 
     # Use centralized client
     client = get_client()
+    # Local intent classifier loads in the background; the LLM answers meanwhile
+    warm_up(INTENT_PROMPT)
     if client:
         print("✓ OpenAI connected")
     else:
         print("⚠ No API key - running in mock mode")
 
-    path = "data/user_profile.json"
-    with open(path, "r") as f:
-        profile = json.load(f)
+    profile = load_user_profile("data/user_profile.json")
 
     # Interactive loop
     print("\n" + "="*60)
@@ -53,8 +92,13 @@ def main():
         if not query:
             continue
 
-        response = handle_user_query(query, profile, client)
-        print(f"\n{response}\n")
+        # Advice is printed token by token as it streams in
+        print()
+        response = handle_user_query(query, profile, client, stream_to=sys.stdout)
+        if response["type"] == "advice":
+            print("\n")
+        else:
+            print(f"{response}\n")
 
 
 if __name__ == "__main__":
@@ -1,19 +1,11 @@
 """Main entry point for the Fitness Data Assistant."""
-import os
-
 from .data_loader import load_and_normalize_csv, get_unsupported_exercises
 from .data_analyzer import generate_user_profile
 
 def run_profile_generation(csv_path: str, output_path: str = None) -> dict:
     df = load_and_normalize_csv(csv_path)
-    profile = generate_user_profile(df, output_path)
-
-    if output_path:
-        import json
-        with open(output_path, "w") as f:
-            json.dump(profile, f, indent=2)
-
-    return profile
+    # generate_user_profile writes output_path itself
+    return generate_user_profile(df, output_path)
 
 
 def main():
@@ -22,7 +14,8 @@ def main():
     
     # Load and normalize data
     print("Loading data...")
-    df = load_and_normalize_csv(csv_path)
+    # The normalized export keeps every column of the source CSV
+    df = load_and_normalize_csv(csv_path, usecols=None)
     df.to_csv("data/workout_data_normalized.csv", index=False)
     print(f"✓ Loaded {len(df)} sets from supported exercises")
     
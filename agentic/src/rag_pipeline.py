@@ -1,9 +1,17 @@
 """RAG pipeline - fact extraction and advice generation."""
-from typing import Tuple, Optional, List, Dict, Any
-import json
+import heapq
+import threading
+from collections import OrderedDict
+from typing import IO, Tuple, Optional, List, Dict, Any
 
-from .data_analyzer import load_user_profile
-from .tracing import maybe_track, update_current_span, log_generation_context
+import orjson
+
+from . import response_cache
+from .llm_client import ADVICE_TIMEOUT, ROUTINE_TIMEOUT, llm_breaker
+from .tracing import (
+    maybe_track, update_current_span, update_current_span_lazy, generation_context_metadata,
+    prompt_cache_metadata
+)
 
 
 COACH_PROMPT = """You are an experienced strength coach analyzing a user's training data.
@@ -15,76 +23,207 @@ RULES:
 - Reference their actual numbers
 - Keep response concise (3-5 sentences)
 
-USER'S TRAINING DATA:
-{facts}
-
+The user's training data is given in the first user message.
 Answer their question based on this data."""
 
 
+# Static, so the provider can serve it from its prompt-prefix cache; the
+# per-request facts, feedback and query are sent as separate user messages
+PLAN_PROMPT = """You are an expert strength coach designing a TRAINING PLAN.
+
+RULES:
+- Base ALL decisions ONLY on the provided facts and previous feedback
+- Do NOT assume missing information
+- Infer plan duration and structure from the user's request
+- Prefer exercises mentioned in the facts
+- Address imbalances or undertrained muscles if present in facts
+- Keep volume realistic
+- For suggested_weight_kg, use the user's actual numbers from the facts (recent sessions, PRs) to recommend appropriate working weights. If no data exists for an exercise, set to null.
+- IMPORTANT: If previous feedback indicates routines were too hard/easy, adjust volume and intensity accordingly
+
+The FACTS (and any PREVIOUS FEEDBACK) come in the first user message, the USER REQUEST in the last."""
+
+
+# Strict structured output: the reply always parses and matches this schema,
+# so the schema itself no longer needs to be spelled out in PLAN_PROMPT
+_NULLABLE_NUMBER = {"type": ["number", "null"]}
+
+_ROUTINE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "training_plan",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "goal": {"type": "string"},
+                "level": {"type": "string"},
+                "plan_type": {"type": "string", "enum": ["single_session", "weekly_plan", "multi_week_program"]},
+                "duration": {
+                    "type": "object",
+                    "properties": {"weeks": _NULLABLE_NUMBER, "days_per_week": _NULLABLE_NUMBER},
+                    "required": ["weeks", "days_per_week"],
+                    "additionalProperties": False,
+                },
+                "sessions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "day": {"type": "string"},
+                            "focus": {"type": "string"},
+                            "exercises": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "name": {"type": "string"},
+                                        "primary_muscle": {"type": "string"},
+                                        "sets": {"type": "number"},
+                                        "reps": {"type": "string"},
+                                        "suggested_weight_kg": _NULLABLE_NUMBER,
+                                        "rest_seconds": {"type": "number"},
+                                        "notes": {"type": "string"},
+                                    },
+                                    "required": [
+                                        "name", "primary_muscle", "sets", "reps",
+                                        "suggested_weight_kg", "rest_seconds", "notes"
+                                    ],
+                                    "additionalProperties": False,
+                                },
+                            },
+                        },
+                        "required": ["day", "focus", "exercises"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["title", "goal", "level", "plan_type", "duration", "sessions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+FEEDBACK_GUIDANCE = """IMPORTANT: Use this feedback to adjust the NEW routine based on the OLD routine structure shown above.
+- If outcome was "too hard": Reduce sets by 1-2 OR reduce reps by 2-3 OR reduce both slightly
+- If outcome was "worked well": Use similar volume/structure as a good baseline
+- If outcome was "too easy": Add 1 set per exercise OR add 2-3 reps OR add an exercise
+- Maintain similar exercise selection unless feedback indicates issues with specific movements"""
+
+
+# Formatted fact lines per profile object. Profiles are shared, read-only
+# dicts (profile_store / load_user_profile caches), so the memo lives here
+# rather than on the profile. Entries hold the profile itself, which keeps
+# its id() from being reused while the entry exists.
+_FACTS_CACHE_SIZE = 256
+_facts_caches: "OrderedDict[int, Tuple[dict, dict]]" = OrderedDict()
+_facts_caches_lock = threading.Lock()
+
+
+def _facts_cache(profile: dict) -> dict:
+    key = id(profile)
+    with _facts_caches_lock:
+        entry = _facts_caches.get(key)
+        if entry is not None and entry[0] is profile:
+            _facts_caches.move_to_end(key)
+            return entry[1]
+        cache = {"overview": None, "exercise": {}, "muscle": {}}
+        _facts_caches[key] = (profile, cache)
+        _facts_caches.move_to_end(key)
+        if len(_facts_caches) > _FACTS_CACHE_SIZE:
+            _facts_caches.popitem(last=False)
+        return cache
+
+
+def _overview_facts(profile: dict) -> list[str]:
+    g = profile["global"]
+    facts = [
+        f"[Training Overview]",
+        f"  - Sessions: {g['total_sessions']} over {g['weeks_tracked']} weeks",
+        f"  - Push/Pull ratio: {g['push_pull_ratio']}:1",
+        f"  - Upper/Lower ratio: {g['upper_lower_ratio']}:1",
+    ]
+
+    if g["undertrained_muscles"]:
+        facts.append(f"  - Undertrained: {', '.join(g['undertrained_muscles'])}")
+
+    exercises = profile["exercises"]
+    sorted_ex = heapq.nlargest(3, exercises.items(), key=lambda x: x[1]["total_volume_kg"])
+    top_str = ", ".join([f"{e[0]} ({e[1]['total_volume_kg']}kg)" for e in sorted_ex])
+    facts.append(f"  - Top exercises: {top_str}")
+    return facts
+
+
+def _exercise_facts(ex_id: str, ex: dict) -> list[str]:
+    facts = [
+        f"[Exercise: {ex_id}] {ex['summary']}",
+        f"  - Total: {ex['total_sets']} sets, {ex['total_reps']} reps, {ex['total_volume_kg']}kg total volume",
+        f"  - PR (heaviest): {ex['pr_weight']['display']} on {ex['pr_weight']['date']}",
+        f"  - PR (best volume set): {ex['pr_volume']['display']} on {ex['pr_volume']['date']}",
+        f"  - Estimated 1RM: {ex['estimated_1rm']['value']}kg (from {ex['estimated_1rm']['from_set']})",
+        f"  - Trend: {ex['trend']['direction']} ({ex['trend']['change_percent']}% change)",
+        f"  - Rep style: Heavy(1-5) {ex['rep_distribution']['heavy_1_5']}%, Moderate(6-10) {ex['rep_distribution']['moderate_6_10']}%, Light(11+) {ex['rep_distribution']['light_11_plus']}%",
+    ]
+
+    if ex.get("top_sets"):
+        top_str = ", ".join([f"{s['display']} (e1RM:{s['e1rm']})" for s in ex["top_sets"][:3]])
+        facts.append(f"  - Top sets: {top_str}")
+
+    if ex["recent_sessions"]:
+        for session in ex["recent_sessions"][:2]:
+            facts.append(f"  - Session {session['date']}: {session['sets_display']} (vol: {session['session_volume']}kg)")
+    return facts
+
+
+def _muscle_facts(muscle: str, m: dict, exercises: dict) -> list[str]:
+    facts = [
+        f"[Muscle: {muscle}] {m['summary']}",
+        f"  - Exercises: {', '.join(m['exercises'])}",
+        f"  - Weekly sets: {m['weekly_sets_avg']} (recommended: {m['recommended_weekly_sets']})",
+        f"  - Status: {m['status']}",
+    ]
+
+    for ex_id in m["exercises"]:
+        if ex_id in exercises:
+            facts.append(f"  - {ex_id}: {exercises[ex_id]['summary']}")
+    return facts
+
+
 @maybe_track(name="get_relevant_facts")
 def get_relevant_facts(params: dict, profile: dict) -> list[str]:
     """Extract rich, relevant facts from profile based on query params (supports multiple targets)."""
-    facts = []
     targets = params.get("targets", [])
+    cache = _facts_cache(profile)
 
-    g = profile["global"]
-    facts.append(f"[Global] {g['summary']}")
+    facts = [f"[Global] {profile['global']['summary']}"]
 
     if not targets:
         # No specific targets - show training overview
-        facts.append(f"[Training Overview]")
-        facts.append(f"  - Sessions: {g['total_sessions']} over {g['weeks_tracked']} weeks")
-        facts.append(f"  - Push/Pull ratio: {g['push_pull_ratio']}:1")
-        facts.append(f"  - Upper/Lower ratio: {g['upper_lower_ratio']}:1")
-
-        if g["undertrained_muscles"]:
-            facts.append(f"  - Undertrained: {', '.join(g['undertrained_muscles'])}")
-
-        exercises = profile["exercises"]
-        sorted_ex = sorted(exercises.items(), key=lambda x: x[1]["total_volume_kg"], reverse=True)[:3]
-        top_str = ", ".join([f"{e[0]} ({e[1]['total_volume_kg']}kg)" for e in sorted_ex])
-        facts.append(f"  - Top exercises: {top_str}")
+        if cache["overview"] is None:
+            cache["overview"] = _overview_facts(profile)
+        facts.extend(cache["overview"])
     else:
         # Process each target
         for target in targets:
-            if target["type"] == "exercise" and target["value"] in profile["exercises"]:
-                ex = profile["exercises"][target["value"]]
-                facts.append(f"[Exercise: {target['value']}] {ex['summary']}")
-                facts.append(f"  - Total: {ex['total_sets']} sets, {ex['total_reps']} reps, {ex['total_volume_kg']}kg total volume")
-                facts.append(f"  - PR (heaviest): {ex['pr_weight']['display']} on {ex['pr_weight']['date']}")
-                facts.append(f"  - PR (best volume set): {ex['pr_volume']['display']} on {ex['pr_volume']['date']}")
-                facts.append(f"  - Estimated 1RM: {ex['estimated_1rm']['value']}kg (from {ex['estimated_1rm']['from_set']})")
-                facts.append(f"  - Trend: {ex['trend']['direction']} ({ex['trend']['change_percent']}% change)")
-                facts.append(f"  - Rep style: Heavy(1-5) {ex['rep_distribution']['heavy_1_5']}%, Moderate(6-10) {ex['rep_distribution']['moderate_6_10']}%, Light(11+) {ex['rep_distribution']['light_11_plus']}%")
-
-                if ex.get("top_sets"):
-                    top_str = ", ".join([f"{s['display']} (e1RM:{s['e1rm']})" for s in ex["top_sets"][:3]])
-                    facts.append(f"  - Top sets: {top_str}")
-
-                if ex["recent_sessions"]:
-                    for session in ex["recent_sessions"][:2]:
-                        facts.append(f"  - Session {session['date']}: {session['sets_display']} (vol: {session['session_volume']}kg)")
-
-            elif target["type"] == "muscle" and target["value"] in profile["muscles"]:
-                m = profile["muscles"][target["value"]]
-                facts.append(f"[Muscle: {target['value']}] {m['summary']}")
-                facts.append(f"  - Exercises: {', '.join(m['exercises'])}")
-                facts.append(f"  - Weekly sets: {m['weekly_sets_avg']} (recommended: {m['recommended_weekly_sets']})")
-                facts.append(f"  - Status: {m['status']}")
-
-                for ex_id in m["exercises"]:
-                    if ex_id in profile["exercises"]:
-                        ex = profile["exercises"][ex_id]
-                        facts.append(f"  - {ex_id}: {ex['summary']}")
-
-    # Log facts extraction
-    facts_text = "\n".join(facts)
-    log_generation_context(
-        facts_count=len(facts),
-        facts_text_length=len(facts_text),
-        generation_type="extraction"
-    )
-    update_current_span(metadata={
+            value = target["value"]
+            if target["type"] == "exercise" and value in profile["exercises"]:
+                lines = cache["exercise"].get(value)
+                if lines is None:
+                    lines = cache["exercise"][value] = _exercise_facts(value, profile["exercises"][value])
+                facts.extend(lines)
+
+            elif target["type"] == "muscle" and value in profile["muscles"]:
+                lines = cache["muscle"].get(value)
+                if lines is None:
+                    lines = cache["muscle"][value] = _muscle_facts(value, profile["muscles"][value], profile["exercises"])
+                facts.extend(lines)
+
+    # Log facts extraction; the joined length is computed without building
+    # the text, which the generators join once themselves
+    update_current_span_lazy(lambda: {
+        **generation_context_metadata(len(facts), sum(map(len, facts)) + len(facts) - 1, "extraction"),
         "facts_extracted": len(facts),
         "targets_count": len(targets),
         "target_types": [t["type"] for t in targets],
@@ -95,55 +234,123 @@ def get_relevant_facts(params: dict, profile: dict) -> list[str]:
     return facts
 
 
+# Generation settings are part of the response cache key
+_ADVICE_CACHE_SCOPE = "advice:gpt-4o-mini:300"
+_ROUTINE_CACHE_SCOPE = "routine:gpt-4o-mini:1200"
+
+# Streamed replies only report usage (incl. cached prompt tokens) when asked
+_STREAM_KWARGS = {"stream": True, "stream_options": {"include_usage": True}}
+
+
 @maybe_track(name="generate_advice")
-def generate_advice(query: str, facts: list[str], client=None) -> Tuple[str, str]:
+def generate_advice(
+    query: str,
+    facts: list[str],
+    client=None,
+    stream_to: Optional[IO[str]] = None,
+    bypass_cache: bool = False
+) -> Tuple[str, str]:
     """
     Generate advice based on query and facts.
 
+    Args:
+        stream_to: If provided (e.g. sys.stdout), the advice is written there as
+                   it is generated; the full text is still returned.
+        bypass_cache: Always call the LLM, ignoring stored responses.
+
     Returns:
         Tuple of (advice_text, generation_method)
     """
     facts_text = "\n".join(facts)
 
+    if client is None:
+        result = f"Based on your data:\n\n{facts_text}\n\n[LLM not connected - add OPENAI_API_KEY to .env for real advice]"
+        _write_stream(stream_to, result)
+        return result, "mock"
+
     # Log generation context
-    log_generation_context(
-        facts_count=len(facts),
-        facts_text_length=len(facts_text),
-        generation_type="advice"
-    )
     update_current_span(metadata={
+        **generation_context_metadata(len(facts), len(facts_text), "advice"),
         "generation_type": "advice",
         "facts_count": len(facts),
         "facts_text_length": len(facts_text),
         "query_length": len(query)
     })
 
-    if client is None:
-        result = f"Based on your data:\n\n{facts_text}\n\n[LLM not connected - add OPENAI_API_KEY to .env for real advice]"
-        return result, "mock"
+    cached, cache_probe = response_cache.lookup(_ADVICE_CACHE_SCOPE, facts_text, query, bypass=bypass_cache)
+    update_current_span(metadata={"cache_hit": cached is not None})
+    if cached is not None:
+        _write_stream(stream_to, cached)
+        return cached, "cache"
+
+    if not llm_breaker.allow():
+        update_current_span(metadata={"generation_method": "circuit_open"})
+        result = f"Based on your data:\n\n{facts_text}\n\n[Coaching model temporarily unavailable - please try again shortly]"
+        _write_stream(stream_to, result)
+        return result, "circuit_open"
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": COACH_PROMPT.format(facts=facts_text)},
-                {"role": "user", "content": query}
-            ],
-            max_tokens=300
-        )
-
-        advice = response.choices[0].message.content.strip()
+        try:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": COACH_PROMPT},
+                    {"role": "user", "content": f"USER'S TRAINING DATA:\n{facts_text}"},
+                    {"role": "user", "content": query}
+                ],
+                max_tokens=300,
+                timeout=ADVICE_TIMEOUT,
+                **_STREAM_KWARGS if stream_to is not None else {}
+            )
+            if stream_to is None:
+                advice = response.choices[0].message.content.strip()
+                usage = response.usage
+            else:
+                advice, usage = _consume_stream(response, stream_to)
+        except Exception:
+            llm_breaker.record_failure()
+            raise
+        llm_breaker.record_success()
+
         update_current_span(metadata={
             "advice_length": len(advice),
-            "generation_method": "llm"
+            "generation_method": "llm_stream" if stream_to is not None else "llm",
+            **prompt_cache_metadata(usage)
         })
+        response_cache.store(cache_probe, advice)
         return advice, "llm"
     except Exception as e:
         update_current_span(metadata={
             "generation_method": "llm_error",
             "error": str(e)
         })
-        return f"Error generating advice: {str(e)}", "llm_error"
+        result = f"Error generating advice: {str(e)}"
+        _write_stream(stream_to, result)
+        return result, "llm_error"
+
+
+def _consume_stream(response, stream_to: IO[str]) -> Tuple[str, Any]:
+    """Write token deltas to stream_to as they arrive; return the full text and usage."""
+    parts = []
+    usage = None
+    for chunk in response:
+        # The usage-only chunk at the end of the stream has no choices
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            stream_to.write(delta)
+            stream_to.flush()
+    return "".join(parts).strip(), usage
+
+
+def _write_stream(stream_to: Optional[IO[str]], text: str) -> None:
+    if stream_to is not None:
+        stream_to.write(text)
+        stream_to.flush()
 
 
 @maybe_track(name="generate_routine")
@@ -151,8 +358,9 @@ def generate_routine(
     query: str,
     facts: list[str],
     client=None,
-    episodes: Optional[List[Dict[str, Any]]] = None
-) -> Tuple[dict, str]:
+    episodes: Optional[List[Dict[str, Any]]] = None,
+    bypass_cache: bool = False
+) -> Tuple[Optional[dict], str]:
     """
     Generate a structured training plan (single session, weekly plan, or multi-week program)
     based ONLY on extracted facts and the user's request.
@@ -162,10 +370,42 @@ def generate_routine(
         facts: List of extracted facts about user's training data
         client: OpenAI client
         episodes: Optional list of formatted episodes with past feedback
+        bypass_cache: Always call the LLM, ignoring stored responses
 
     Returns:
-        Tuple of (routine_dict, generation_method)
+        Tuple of (routine_dict, generation_method); routine_dict is None when
+        the circuit breaker is open
     """
+    if client is None:
+        # Safe deterministic fallback
+        routine = {
+            "title": "Full Body Training Plan",
+            "goal": "general_strength",
+            "level": "intermediate",
+            "plan_type": "single_session",
+            "duration": {
+                "weeks": None,
+                "days_per_week": None
+            },
+            "sessions": [
+                {
+                    "day": "Session 1",
+                    "focus": "Full Body",
+                    "exercises": [
+                        {
+                            "name": "Squat",
+                            "primary_muscle": "legs",
+                            "sets": 4,
+                            "reps": "6-8",
+                            "rest_seconds": 150,
+                            "notes": "Progress when all reps feel solid"
+                        }
+                    ]
+                }
+            ]
+        }
+        return routine, "mock"
+
     facts_text = "\n".join(facts)
 
     # Format episodes for prompt
@@ -199,12 +439,8 @@ def generate_routine(
         episodes_text = "\n\n".join(episode_lines)
 
     # Log generation context
-    log_generation_context(
-        facts_count=len(facts),
-        facts_text_length=len(facts_text),
-        generation_type="routine"
-    )
     update_current_span(metadata={
+        **generation_context_metadata(len(facts), len(facts_text), "routine"),
         "generation_type": "routine",
         "facts_count": len(facts),
         "facts_text_length": len(facts_text),
@@ -213,115 +449,45 @@ def generate_routine(
         "episodes_included": bool(episodes_text)
     })
 
-    PLAN_PROMPT = f"""You are an expert strength coach designing a TRAINING PLAN.
-
-    RULES:
-    - Base ALL decisions ONLY on the provided facts and previous feedback
-    - Do NOT assume missing information
-    - Infer plan duration and structure from the user's request
-    - Prefer exercises mentioned in the facts
-    - Address imbalances or undertrained muscles if present in facts
-    - Keep volume realistic
-    - For suggested_weight_kg, use the user's actual numbers from the facts (recent sessions, PRs) to recommend appropriate working weights. If no data exists for an exercise, set to null.
-    - IMPORTANT: If previous feedback indicates routines were too hard/easy, adjust volume and intensity accordingly
-
-    OUTPUT RULES:
-    - Output VALID JSON ONLY
-    - Do NOT include explanations outside JSON
-    - Follow the schema exactly
-
-    TRAINING PLAN JSON SCHEMA:
-    {{
-    "title": string,
-    "goal": string,
-    "level": string,
-    "plan_type": "single_session" | "weekly_plan" | "multi_week_program",
-    "duration": {{
-        "weeks": number | null,
-        "days_per_week": number | null
-    }},
-    "sessions": [
-        {{
-        "day": string,
-        "focus": string,
-        "exercises": [
-            {{
-            "name": string,
-            "primary_muscle": string,
-            "sets": number,
-            "reps": string,
-            "suggested_weight_kg": number | null,
-            "rest_seconds": number,
-            "notes": string
-            }}
-        ]
-        }}
-    ]
-    }}
-
-    FACTS:
-    {facts_text}
-
-    {f'''PREVIOUS FEEDBACK:
-{episodes_text}
+    context_text = f"FACTS:\n{facts_text}"
+    if episodes_text:
+        context_text += f"\n\nPREVIOUS FEEDBACK:\n{episodes_text}\n\n{FEEDBACK_GUIDANCE}"
 
-IMPORTANT: Use this feedback to adjust the NEW routine based on the OLD routine structure shown above.
-- If outcome was "too hard": Reduce sets by 1-2 OR reduce reps by 2-3 OR reduce both slightly
-- If outcome was "worked well": Use similar volume/structure as a good baseline
-- If outcome was "too easy": Add 1 set per exercise OR add 2-3 reps OR add an exercise
-- Maintain similar exercise selection unless feedback indicates issues with specific movements
-''' if episodes_text else ''}
+    cached, cache_probe = response_cache.lookup(
+        _ROUTINE_CACHE_SCOPE, context_text, query, bypass=bypass_cache, near_match=False
+    )
+    update_current_span(metadata={"cache_hit": cached is not None})
+    if cached is not None:
+        return cached, "cache"
 
-    USER REQUEST:
-    {query}
-    """
-
-    if client is None:
-        # Safe deterministic fallback
-        routine = {
-            "title": "Full Body Training Plan",
-            "goal": "general_strength",
-            "level": "intermediate",
-            "plan_type": "single_session",
-            "duration": {
-                "weeks": None,
-                "days_per_week": None
-            },
-            "sessions": [
-                {
-                    "day": "Session 1",
-                    "focus": "Full Body",
-                    "exercises": [
-                        {
-                            "name": "Squat",
-                            "primary_muscle": "legs",
-                            "sets": 4,
-                            "reps": "6-8",
-                            "rest_seconds": 150,
-                            "notes": "Progress when all reps feel solid"
-                        }
-                    ]
-                }
-            ]
-        }
-        return routine, "mock"
+    if not llm_breaker.allow():
+        # No placeholder plan: callers must not save an empty routine
+        update_current_span(metadata={"generation_method": "circuit_open"})
+        return None, "circuit_open"
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": PLAN_PROMPT
-                }
-            ],
-            max_tokens=1200
-        )
-
-        routine = json.loads(response.choices[0].message.content.strip())
+        try:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": PLAN_PROMPT},
+                    {"role": "user", "content": context_text},
+                    {"role": "user", "content": f"USER REQUEST:\n{query}"}
+                ],
+                max_tokens=1200,
+                timeout=ROUTINE_TIMEOUT,
+                response_format=_ROUTINE_FORMAT
+            )
+        except Exception:
+            llm_breaker.record_failure()
+            raise
+        llm_breaker.record_success()
+
+        # orjson skips surrounding whitespace itself, no strip() copy needed
+        routine = orjson.loads(response.choices[0].message.content)
 
         # Log routine details
-        update_current_span(metadata={
+        update_current_span_lazy(lambda: {
             "routine_title": routine.get("title"),
             "routine_type": routine.get("plan_type"),
             "sessions_count": len(routine.get("sessions", [])),
@@ -329,11 +495,14 @@ IMPORTANT: Use this feedback to adjust the NEW routine based on the OLD routine
                 len(s.get("exercises", []))
                 for s in routine.get("sessions", [])
             ),
-            "generation_method": "llm"
+            "generation_method": "llm",
+            **prompt_cache_metadata(response.usage)
         })
 
+        response_cache.store(cache_probe, routine)
         return routine, "llm"
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
+        # Only reachable when the reply is cut off at max_tokens
         update_current_span(metadata={
             "generation_method": "llm_json_error",
             "error": str(e)
@@ -0,0 +1,141 @@
+"""Response cache for advice / routine generation.
+
+Entries are keyed on the exact prompt inputs (scope, facts/context text and
+query). Chat history before the Current Query marker is hashed together with
+the context, so entries are only ever shared between identical conversations.
+On an exact miss, earlier questions over the same context and history are
+compared by embedding similarity (callers opt in with near_match), so a
+rephrased question reuses the stored response. Near-matching needs the
+optional local encoder (see intent_setfit); without it only exact matches hit.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Tuple
+
+import orjson
+
+from .intent_setfit import embed_query
+
+
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 3600.0
+SIMILARITY_THRESHOLD = 0.95
+
+# Enriched queries end with this section; the text after it is the question
+_CURRENT_QUERY_MARKER = "=== Current Query ==="
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    context_hash: str
+    embedding: Any
+    payload: bytes
+
+
+class CacheProbe(NamedTuple):
+    key: str
+    context_hash: str
+    question: Optional[str]  # None when the entry is exact-match only
+
+
+_cache: "OrderedDict[str, _Entry]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _split_query(normalized_query: str) -> Tuple[str, str]:
+    """(chat history/episodes, the user's own question) of an enriched query."""
+    history, found, question = normalized_query.rpartition(_CURRENT_QUERY_MARKER.lower())
+    if not found:
+        return "", normalized_query
+    return history, question.strip()
+
+
+def lookup(
+    scope: str,
+    context: str,
+    query: str,
+    bypass: bool = False,
+    near_match: bool = True
+) -> Tuple[Optional[Any], CacheProbe]:
+    """
+    Look up a stored response.
+
+    Args:
+        scope: Identifies the call site and generation settings (model, max_tokens)
+        context: Everything besides the query that goes into the prompt
+        query: The user query (optionally enriched with chat history)
+        bypass: Skip the lookup and only build the probe for store()
+        near_match: Also reuse responses to similar questions (exact key only when False)
+
+    Returns:
+        Tuple of (cached value or None, probe to pass to store() on a miss)
+    """
+    history, question = _split_query(" ".join(query.lower().split()))
+    context_hash = _digest(scope, context, history)
+    probe = CacheProbe(_digest(context_hash, question), context_hash, question if near_match else None)
+    if bypass:
+        return None, probe
+    now = time.monotonic()
+
+    with _lock:
+        entry = _cache.get(probe.key)
+        if entry is not None and entry.expires_at > now:
+            _cache.move_to_end(probe.key)
+            return orjson.loads(entry.payload), probe
+        if not near_match:
+            return None, probe
+        candidates = [
+            (key, e) for key, e in _cache.items()
+            if e.context_hash == context_hash and e.embedding is not None and e.expires_at > now
+        ]
+
+    # Only embed when there is something over the same context to compare with
+    if not candidates:
+        return None, probe
+    embedding = embed_query(probe.question)
+    if embedding is None:
+        return None, probe
+
+    best_key, best_entry, best_score = None, None, SIMILARITY_THRESHOLD
+    for key, e in candidates:
+        score = float(e.embedding @ embedding)
+        if score >= best_score:
+            best_key, best_entry, best_score = key, e, score
+    if best_entry is None:
+        return None, probe
+
+    with _lock:
+        if best_key in _cache:
+            _cache.move_to_end(best_key)
+    return orjson.loads(best_entry.payload), probe
+
+
+def store(probe: CacheProbe, value: Any) -> None:
+    """Store a JSON-serializable response under the probe returned by lookup()."""
+    entry = _Entry(
+        time.monotonic() + RESPONSE_CACHE_TTL,
+        probe.context_hash,
+        embed_query(probe.question) if probe.question is not None else None,
+        orjson.dumps(value)
+    )
+    with _lock:
+        _cache[probe.key] = entry
+        _cache.move_to_end(probe.key)
+        while len(_cache) > RESPONSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear() -> None:
+    """Drop all cached responses."""
+    with _lock:
+        _cache.clear()
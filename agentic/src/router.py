@@ -1,12 +1,18 @@
 """Query router - orchestrates query handling."""
-import pandas as pd
-from typing import Dict, Any, Optional, List
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Any, Optional, List
 
 from .config import Intent
 from .intent_classifier import classify_intent
-from .data_access import extract_query_params, get_exercise_history, format_history_response
+from .data_access import extract_query_params
 from .rag_pipeline import get_relevant_facts, generate_advice, generate_routine
-from .tracing import maybe_track, update_current_span, update_current_trace
+from .tracing import maybe_track, update_current_span, update_current_span_lazy
+
+
+# Runs extract_query_params alongside classify_intent; both are independent
+# LLM round trips, so routing waits on one RTT instead of two
+_params_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="query-params")
 
 
 @maybe_track(name="handle_user_query")
@@ -15,7 +21,9 @@ def handle_user_query(
     profile: dict,
     client=None,
     override_intent: Optional[str] = None,
-    episodes: Optional[List[Dict[str, Any]]] = None
+    episodes: Optional[List[Dict[str, Any]]] = None,
+    query_params: Optional[Dict[str, Any]] = None,
+    stream_to: Optional[IO[str]] = None
 ) -> Dict[str, Any]:
     """
     Main entry point for handling user queries.
@@ -26,8 +34,17 @@ def handle_user_query(
         client: OpenAI client
         override_intent: If provided, skip classify_intent and use this intent (from unified_classify)
         episodes: Optional list of formatted episodes for routine generation
+        query_params: If provided, skip extract_query_params and use these params (from unified_classify)
+        stream_to: If provided, advice text is streamed to it as it is generated
     """
 
+    # Start param extraction first so it overlaps with intent classification.
+    # The copied context keeps the call under this trace span.
+    pending_params = None
+    if query_params is None and client is not None and not override_intent:
+        ctx = contextvars.copy_context()
+        pending_params = _params_executor.submit(ctx.run, extract_query_params, query, client)
+
     if override_intent:
         intent = override_intent
         intent_method = "unified_classifier"
@@ -35,14 +52,19 @@ def handle_user_query(
         intent, intent_method = classify_intent(query, client)
 
     # Extract query params
-    params = extract_query_params(query, client)
+    if pending_params is not None:
+        params = pending_params.result()
+    elif query_params is not None:
+        params = query_params
+    else:
+        params = extract_query_params(query, client)
 
     # Get relevant facts
     facts = get_relevant_facts(params, profile)
 
     # Log the routing decision
     targets = params.get("targets", [])
-    update_current_span(metadata={
+    update_current_span_lazy(lambda: {
         "routing": {
             "intent": intent,
             "intent_method": intent_method,
@@ -53,41 +75,64 @@ def handle_user_query(
         }
     })
 
-    if intent == Intent.ROUTINE_GENERATION:
-        # Generate routine (now returns tuple)
-        plan, gen_method = generate_routine(query, facts, client, episodes=episodes)
+    handler = _HANDLERS.get(intent, _handle_unknown)
+    return handler(query, facts, client, episodes, stream_to)
 
+
+def _handle_routine(query, facts, client, episodes, stream_to) -> Dict[str, Any]:
+    # Generate routine (now returns tuple)
+    plan, gen_method = generate_routine(query, facts, client, episodes=episodes)
+
+    if plan is None:
         update_current_span(metadata={
-            "response_type": "routine",
+            "response_type": "error",
             "generation_method": gen_method
         })
-
         return {
-            "type": "routine",
-            "routine_json": plan
+            "type": "error",
+            "error": "Routine generation is temporarily unavailable. Please try again shortly."
         }
 
-    elif intent == Intent.REASONING:
-        # Generate advice (now returns tuple)
-        advice, gen_method = generate_advice(query, facts, client)
+    update_current_span(metadata={
+        "response_type": "routine",
+        "generation_method": gen_method
+    })
 
-        update_current_span(metadata={
-            "response_type": "advice",
-            "generation_method": gen_method,
-            "advice_length": len(advice)
-        })
+    return {
+        "type": "routine",
+        "routine_json": plan
+    }
 
-        return {
-            "type": "advice",
-            "advice": advice
-        }
 
-    else:
-        update_current_span(metadata={
-            "response_type": "error",
-            "error": "unknown_intent"
-        })
-        return {
-            "type": "error",
-            "error": "Wrong intent output from intent classifier."
-        }
+def _handle_advice(query, facts, client, episodes, stream_to) -> Dict[str, Any]:
+    # Generate advice (now returns tuple)
+    advice, gen_method = generate_advice(query, facts, client, stream_to=stream_to)
+
+    update_current_span(metadata={
+        "response_type": "advice",
+        "generation_method": gen_method,
+        "advice_length": len(advice)
+    })
+
+    return {
+        "type": "advice",
+        "advice": advice
+    }
+
+
+def _handle_unknown(query, facts, client, episodes, stream_to) -> Dict[str, Any]:
+    update_current_span(metadata={
+        "response_type": "error",
+        "error": "unknown_intent"
+    })
+    return {
+        "type": "error",
+        "error": "Wrong intent output from intent classifier."
+    }
+
+
+# Intent -> response handler; anything else is reported as an unknown intent
+_HANDLERS = {
+    Intent.ROUTINE_GENERATION: _handle_routine,
+    Intent.REASONING: _handle_advice,
+}
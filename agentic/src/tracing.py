@@ -13,14 +13,39 @@ Usage:
         return process(x)
 """
 import os
-from functools import wraps
+from functools import lru_cache
 from typing import Any, Dict, Optional, Callable
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+
+
+_TRUTHY = frozenset({"1", "true", "yes"})
 
 
 def is_opik_enabled() -> bool:
     """Check if Opik instrumentation is enabled."""
-    return os.getenv("OPIK_ENABLED", "").lower() in ("1", "true", "yes")
+    return os.getenv("OPIK_ENABLED", "").lower() in _TRUTHY
+
+
+@lru_cache(maxsize=1)
+def _opik():
+    """Import Opik once; (opik_context, track), or (None, None) when not installed."""
+    try:
+        from opik import opik_context, track
+    except ImportError:
+        return None, None
+    return opik_context, track
+
+
+def _active_context():
+    """
+    opik_context when tracing is on, else None.
+
+    OPIK_ENABLED is checked on every call rather than frozen at import, so a
+    .env loaded after this module (backend.storage.db) still takes effect.
+    """
+    if not is_opik_enabled():
+        return None
+    return _opik()[0]
 
 
 def maybe_track(name: Optional[str] = None):
@@ -38,15 +63,14 @@ def maybe_track(name: Optional[str] = None):
         def detect_feedback(message: str) -> bool:
             ...
     """
-    def decorator(fn: Callable) -> Callable:
-        if is_opik_enabled():
-            try:
-                from opik import track
-                return track(name=name)(fn)
-            except ImportError:
-                pass
-        return fn
-    return decorator
+    track = _opik()[1] if is_opik_enabled() else None
+    if track is None:
+        return _identity
+    return track(name=name)
+
+
+def _identity(fn: Callable) -> Callable:
+    return fn
 
 
 def update_current_span(
@@ -66,11 +90,11 @@ def update_current_span(
         output: Override the output captured by @track
         tags: List of tags to add to the span
     """
-    if not is_opik_enabled():
+    opik_context = _active_context()
+    if opik_context is None:
         return
 
     try:
-        from opik import opik_context
         context = opik_context.get_current_span_data()
         if context is None:
             return
@@ -83,10 +107,22 @@ def update_current_span(
             opik_context.update_current_span(output=output)
         if tags:
             opik_context.update_current_span(tags=tags)
-    except (ImportError, AttributeError):
+    except AttributeError:
         pass
 
 
+def update_current_span_lazy(build: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Update the current span with metadata from build(), called only when tracing is on.
+
+    Use for metadata that takes work to assemble (comprehensions, sums) so the
+    disabled path skips it entirely.
+    """
+    if _active_context() is None:
+        return
+    update_current_span(metadata=build())
+
+
 def update_current_trace(
     metadata: Optional[Dict[str, Any]] = None,
     tags: Optional[list] = None
@@ -100,20 +136,19 @@ def update_current_trace(
         metadata: Additional metadata for the trace
         tags: List of tags to add to the trace
     """
-    if not is_opik_enabled():
+    opik_context = _active_context()
+    if opik_context is None:
         return
 
     try:
-        from opik import opik_context
         if metadata:
             opik_context.update_current_trace(metadata=metadata)
         if tags:
             opik_context.update_current_trace(tags=tags)
-    except (ImportError, AttributeError):
+    except AttributeError:
         pass
 
 
-@contextmanager
 def span_context(name: str, metadata: Optional[Dict[str, Any]] = None):
     """
     Context manager for creating a child span.
@@ -128,19 +163,26 @@ def span_context(name: str, metadata: Optional[Dict[str, Any]] = None):
         with span_context("ranking", metadata={"candidates": 5}):
             results = rank_candidates(...)
     """
-    if not is_opik_enabled():
-        yield
-        return
+    opik_context = _active_context()
+    if opik_context is None:
+        return _NULL_CONTEXT
+    return _span_context(opik_context, name, metadata)
+
 
+# Shared no-op context for the disabled path, so span_context allocates nothing
+_NULL_CONTEXT = nullcontext()
+
+
+@contextmanager
+def _span_context(opik_context, name: str, metadata: Optional[Dict[str, Any]]):
     try:
-        from opik import opik_context
         span = opik_context.get_current_span_data()
         if span is None:
             yield
             return
 
         # Use Opik's span context
-        from opik import track
+        track = _opik()[1]
 
         @track(name=name)
         def _inner():
@@ -150,7 +192,7 @@ def span_context(name: str, metadata: Optional[Dict[str, Any]] = None):
         # This is a simplified version - in practice you'd use opik.start_span()
         # but that API may vary. The @track decorator handles most cases.
         yield
-    except (ImportError, AttributeError):
+    except AttributeError:
         yield
 
 
@@ -171,7 +213,7 @@ def log_scoring_breakdown(
         decision: Decision type ("resolved", "clarification", "ignore")
         score_gap: Gap between top two scores (if applicable)
     """
-    if not is_opik_enabled():
+    if _active_context() is None:
         return
 
     metadata = {
@@ -207,7 +249,7 @@ def log_feedback_signals(
         outcome_text: Extracted feedback text
         target_signals: Extracted target signals (muscles, exercises, etc.)
     """
-    if not is_opik_enabled():
+    if _active_context() is None:
         return
 
     metadata = {
@@ -234,7 +276,7 @@ def log_intent_classification(
         intent: Classified intent (ROUTINE_GENERATION, REASONING)
         query_params: Extracted query parameters (target, timeframe)
     """
-    if not is_opik_enabled():
+    if _active_context() is None:
         return
 
     metadata = {
@@ -259,7 +301,7 @@ def log_memory_enrichment(
         episodes_count: Number of episodic memories included
         enriched_query_length: Length of the enriched query
     """
-    if not is_opik_enabled():
+    if _active_context() is None:
         return
 
     update_current_span(metadata={
@@ -271,6 +313,25 @@ def log_memory_enrichment(
     })
 
 
+def generation_context_metadata(
+    facts_count: int,
+    facts_text_length: int,
+    generation_type: str
+) -> Dict[str, Any]:
+    """
+    Span metadata describing the context provided to a generation call.
+
+    Merge it into the caller's own span update instead of logging it separately.
+    """
+    return {
+        "generation_context": {
+            "facts_count": facts_count,
+            "facts_text_length": facts_text_length,
+            "generation_type": generation_type
+        }
+    }
+
+
 def log_generation_context(
     facts_count: int,
     facts_text_length: int,
@@ -284,13 +345,18 @@ def log_generation_context(
         facts_text_length: Length of formatted facts text
         generation_type: Type of generation (routine, advice)
     """
-    if not is_opik_enabled():
+    if _active_context() is None:
         return
 
-    update_current_span(metadata={
-        "generation_context": {
-            "facts_count": facts_count,
-            "facts_text_length": facts_text_length,
-            "generation_type": generation_type
-        }
-    })
+    update_current_span(metadata=generation_context_metadata(facts_count, facts_text_length, generation_type))
+
+
+def prompt_cache_metadata(usage) -> Dict[str, Any]:
+    """Prompt-prefix cache stats for span metadata (empty when usage is missing)."""
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_prompt_tokens": getattr(details, "cached_tokens", None) or 0
+    }
@@ -12,11 +12,16 @@ Usage:
     )
     update_current_span(metadata=result.to_metadata())
 """
-from dataclasses import dataclass, field, asdict
+import sys
+from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any, Literal
 
 
-@dataclass
+# Slotted instances (no per-instance __dict__) where supported; slots= needs 3.10+
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ScoreBreakdown:
     """Breakdown of scoring factors for a routine candidate."""
     recency: float = 0.0
@@ -27,10 +32,17 @@ class ScoreBreakdown:
     total: float = 0.0
 
     def to_dict(self) -> Dict[str, float]:
-        return asdict(self)
+        return {
+            "recency": self.recency,
+            "same_chat": self.same_chat,
+            "missing_outcome": self.missing_outcome,
+            "target_match": self.target_match,
+            "negation": self.negation,
+            "total": self.total
+        }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ScoredCandidate:
     """A routine candidate with its scoring breakdown."""
     routine_id: str
@@ -49,7 +61,7 @@ class ScoredCandidate:
         }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ResolutionResult:
     """Result of routine resolution with full context for tracing."""
     type: Literal["resolved", "clarification", "ignore"]
@@ -97,7 +109,7 @@ class ResolutionResult:
             return {"type": "ignore"}
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class FeedbackDetectionResult:
     """Result of feedback detection stage."""
     is_feedback: bool
@@ -110,7 +122,7 @@ class FeedbackDetectionResult:
         }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class OutcomeExtraction:
     """Extracted outcome from feedback."""
     outcome_type: Literal["positive", "negative", "injury", "abandoned"]
@@ -125,7 +137,7 @@ class OutcomeExtraction:
         }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class TargetSignals:
     """Extracted target signals from feedback message."""
     mentioned_muscles: List[str] = field(default_factory=list)
@@ -150,7 +162,7 @@ class TargetSignals:
         }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class IntentClassificationResult:
     """Result of intent classification."""
     intent: Literal["ROUTINE_GENERATION", "REASONING"]
@@ -165,7 +177,7 @@ class IntentClassificationResult:
         }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class MemoryEnrichmentContext:
     """Context about memory enrichment for a query."""
     chat_messages_count: int
@@ -186,7 +198,7 @@ class MemoryEnrichmentContext:
         }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class GenerationContext:
     """Context about facts provided to generation."""
     facts_count: int
@@ -1,10 +1,18 @@
 """Unified intent classification and feedback detection in a single LLM call."""
-import json
+import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
-from .config import Intent
-from .tracing import maybe_track, update_current_span
+import orjson
+
+from .config import EXERCISE_MUSCLE_MAP, Intent
+from .data_access import parse_extraction_result
+from .tracing import maybe_track, prompt_cache_metadata, update_current_span, update_current_span_lazy
 
 
 UNIFIED_PROMPT = """You are a fitness AI assistant analyzing a user's message in context.
@@ -95,6 +103,46 @@ If is_feedback is false, omit the "feedback" key:
 }
 """
 
+# Query-parameter extraction folded into the same call, so the router does
+# not need a second round trip to extract_query_params
+PARAMS_PROMPT = """
+=== QUERY PARAMETERS ===
+
+Also include a "params" key describing what training data the Current Query is about
+(use Chat History only to resolve references like "that one"):
+
+"params": {{
+  "target_type": "exercise" | "muscle" | "muscle_group" | "all",
+  "target_values": ["<exercise_id or muscle name>"],
+  "timeframe": "last_week" | "last_month" | "this_week" | "this_month" | "all"
+}}
+
+Available exercises: {exercises}
+Available muscles: {muscles}
+
+target_values is ALWAYS an array. For muscle groups expand to muscles:
+- "push": ["chest", "shoulders", "triceps"]
+- "pull": ["back", "lats", "traps", "biceps"]
+- "legs": ["quads", "hamstrings", "glutes"]
+Use {{"target_type": "all", "target_values": [], "timeframe": "all"}} when nothing specific is asked.
+""".format(
+    exercises=", ".join(info.exercise_id for info in EXERCISE_MUSCLE_MAP.values()),
+    muscles=", ".join(sorted({info.primary_muscle for info in EXERCISE_MUSCLE_MAP.values()})),
+)
+
+# Static and always sent first, so its ~1.1k tokens sit above OpenAI's
+# 1024-token threshold for automatic prompt-prefix caching. Anything
+# per-request belongs in the user message to keep the prefix byte-identical.
+_SYSTEM_PROMPT = UNIFIED_PROMPT + PARAMS_PROMPT
+
+# Identical enriched queries (client retries, duplicate submits) reuse the
+# earlier LLM classification. Set CLASSIFICATION_CACHE=0 to disable.
+_FALSY = frozenset({"0", "false", "no"})
+_CLASSIFY_CACHE_SIZE = 4096
+_CLASSIFY_CACHE_TTL = 3600.0
+_classify_cache: "OrderedDict[str, Tuple[float, UnifiedClassification]]" = OrderedDict()
+_classify_cache_lock = threading.Lock()
+
 
 @dataclass
 class UnifiedClassification:
@@ -105,6 +153,7 @@ class UnifiedClassification:
     outcome_type: Optional[str] = None
     outcome_text: Optional[str] = None
     target_signals: Optional[Dict[str, Any]] = None
+    query_params: Optional[Dict[str, Any]] = None
 
     @property
     def primary_intent(self) -> str:
@@ -156,22 +205,29 @@ def unified_classify(enriched_query: str, client=None) -> UnifiedClassification:
     if client is None:
         return _classify_keyword_fallback(enriched_query)
 
+    cache_key = hashlib.blake2b(enriched_query.encode(), digest_size=16).hexdigest()
+    cached = _cached_classification(cache_key)
+    if cached is not None:
+        update_current_span_lazy(lambda: {**cached.to_metadata(), "cache_hit": True})
+        return cached
+
     try:
         response = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": UNIFIED_PROMPT},
+                {"role": "system", "content": _SYSTEM_PROMPT},
                 {"role": "user", "content": enriched_query}
             ],
             max_tokens=300,
             response_format={"type": "json_object"}
         )
 
-        result = json.loads(response.choices[0].message.content.strip())
+        result = orjson.loads(response.choices[0].message.content)
 
         intents = result.get("intents", [])
         is_feedback = result.get("is_feedback", False)
         feedback_data = result.get("feedback", {})
+        params_data = result.get("params")
 
         classification = UnifiedClassification(
             intents=intents,
@@ -184,16 +240,19 @@ def unified_classify(enriched_query: str, client=None) -> UnifiedClassification:
                 "mentioned_exercises": feedback_data.get("mentioned_exercises", []),
                 "explicit_routine_refs": feedback_data.get("explicit_routine_refs", []),
                 "negations": feedback_data.get("negations", [])
-            } if is_feedback else None
+            } if is_feedback else None,
+            query_params=parse_extraction_result(params_data) if isinstance(params_data, dict) else None
         )
 
-        update_current_span(metadata={
+        update_current_span_lazy(lambda: {
             **classification.to_metadata(),
             "raw_llm_response": result,
             "enriched_query_length": len(enriched_query),
-            "llm_calls_saved": 3
+            "llm_calls_saved": 4 if classification.query_params is not None else 3,
+            **prompt_cache_metadata(getattr(response, "usage", None))
         })
 
+        _cache_classification(cache_key, classification)
         return classification
 
     except Exception as e:
@@ -204,6 +263,37 @@ def unified_classify(enriched_query: str, client=None) -> UnifiedClassification:
         return _classify_keyword_fallback(enriched_query)
 
 
+def _classify_cache_enabled() -> bool:
+    """Read at call time, so a .env loaded after import still applies."""
+    return os.getenv("CLASSIFICATION_CACHE", "1").lower() not in _FALSY
+
+
+def _cached_classification(key: str) -> Optional[UnifiedClassification]:
+    """Copy of a live cache entry, so callers can mutate the result freely."""
+    if not _classify_cache_enabled():
+        return None
+    with _classify_cache_lock:
+        entry = _classify_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _classify_cache[key]
+            return None
+        _classify_cache.move_to_end(key)
+        return copy.deepcopy(entry[1])
+
+
+def _cache_classification(key: str, classification: UnifiedClassification) -> None:
+    if not _classify_cache_enabled():
+        return
+    entry = (time.monotonic() + _CLASSIFY_CACHE_TTL, copy.deepcopy(classification))
+    with _classify_cache_lock:
+        _classify_cache[key] = entry
+        _classify_cache.move_to_end(key)
+        if len(_classify_cache) > _CLASSIFY_CACHE_SIZE:
+            _classify_cache.popitem(last=False)
+
+
 def _classify_keyword_fallback(enriched_query: str) -> UnifiedClassification:
     """Deterministic keyword-based classification when no LLM client is available."""
     query_lower = enriched_query.lower()
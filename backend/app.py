@@ -5,6 +5,7 @@ from pathlib import Path
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from agentic.src.intent_setfit import warm_up
 from backend.routes.chat import router as chat_router
 from backend.routes.profile import router as profile_router
 from backend.routes.routines import router as routines_router
@@ -40,6 +41,12 @@ app.include_router(chat_router, prefix="/chat", tags=["chat"])
 app.include_router(routines_router, prefix="/routines", tags=["routines"])
 
 
+@app.on_event("startup")
+async def warm_local_encoder():
+    # Background load of the optional embedding model used by the response cache
+    warm_up()
+
+
 @app.api_route("/health", methods=["GET", "HEAD"])
 async def health_check(response: Response):
     response.status_code = 200
@@ -1,17 +1,20 @@
+import asyncio
 import os
-import json
 import logging
+from functools import lru_cache
 from typing import Any, Dict, List
 
+import orjson
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
-from agentic.src.main_chat import run_chat_turn
+from agentic.src.main_chat import run_chat_turn_async
 from agentic.src.llm_client import get_client
-from agentic.src.tracing import maybe_track, update_current_span, log_memory_enrichment
+from agentic.src.tracing import maybe_track, update_current_span, update_current_span_lazy, log_memory_enrichment
 from agentic.src.unified_classifier import unified_classify
 from agentic.src.feedback_resolver import resolve_routine_for_feedback
 from backend.storage.chat_store import (
@@ -37,6 +40,50 @@ class ChatMessageRequest(BaseModel):
     user_id: str
     chat_id: str
     message: str
+    # Stream advice replies as server-sent events instead of one JSON body
+    stream: bool = False
+
+
+class _QueueWriter:
+    """File-like sink that forwards text written in a worker thread to an asyncio queue."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self._loop = loop
+        self._queue = queue
+
+    def write(self, text: str) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"data: {orjson.dumps(event).decode()}\n\n"
+
+
+async def _stream_advice_turn(chat_id: str, **turn_kwargs):
+    """
+    Run an advice turn and yield its text as SSE events while it is generated.
+
+    Emits {"type": "delta", "text": ...} per chunk, then {"type": "chat", "text": <full advice>}
+    once the reply has been saved.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    turn = asyncio.ensure_future(
+        run_chat_turn_async(stream_to=_QueueWriter(loop, queue), **turn_kwargs)
+    )
+    # Writes are queued before the worker returns, so the sentinel comes last
+    turn.add_done_callback(lambda _: queue.put_nowait(None))
+
+    while (text := await queue.get()) is not None:
+        yield _sse({"type": "delta", "text": text})
+
+    response = await turn
+    advice_text = response.get("advice", "")
+    await asyncio.to_thread(save_message, chat_id, "assistant", advice_text)
+    yield _sse({"type": "chat", "text": advice_text})
 
 
 def _load_context(user_id: str) -> Dict[str, Any]:
@@ -49,9 +96,19 @@ def _load_context(user_id: str) -> Dict[str, Any]:
     return profile
 
 
+def _record_and_load_history(chat_id: str, user_id: str, message: str) -> List[Dict[str, Any]]:
+    """Persist the user's message and return the recent history including it."""
+    ensure_chat_session(chat_id, user_id)
+    save_message(chat_id, "user", message)
+    return get_recent_messages(chat_id, limit=10)
+
+
+@lru_cache(maxsize=1)
 def _get_openai_client():
     """
     Get the centralized OpenAI client with optional Opik instrumentation.
+
+    Resolved once per process, so .env is not re-read on every message.
     """
     load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
@@ -205,36 +262,40 @@ async def chat_message(payload: ChatMessageRequest):
         }
     })
 
-    ensure_chat_session(payload.chat_id, payload.user_id)
-    save_message(payload.chat_id, "user", payload.message)
-
     client = _get_openai_client()
-    profile = _load_context(payload.user_id)
+    # Storage calls are blocking round trips to Turso, so they run concurrently
+    # in worker threads (to_thread keeps the tracing context). A missing
+    # profile fails the request here, before the classification call is paid for
+    messages, episodes_raw, profile = await asyncio.gather(
+        asyncio.to_thread(_record_and_load_history, payload.chat_id, payload.user_id, payload.message),
+        asyncio.to_thread(get_episodes_by_user, payload.user_id, 20),
+        asyncio.to_thread(_load_context, payload.user_id),
+    )
 
     # Step 1: Build enriched query
-    messages = get_recent_messages(payload.chat_id, limit=10)
-    episodes_raw = get_episodes_by_user(payload.user_id, limit=20)
     episodes = _format_episodes_for_query(episodes_raw[:5])
     enriched_query = _enrich_query_with_memory(payload.message, messages, episodes)
 
     logger.info(f"Enriched query length: {len(enriched_query)}")
 
     # Step 2: Unified classification (1 LLM call)
-    classification = unified_classify(enriched_query, client)
+    # LLM calls run in worker threads so other requests keep being served
+    classification = await asyncio.to_thread(unified_classify, enriched_query, client)
 
-    update_current_span(metadata={
+    update_current_span_lazy(lambda: {
         "unified_classification": classification.to_metadata(),
         "classifier_version": "v2"
     })
 
     # Step 3: Handle FEEDBACK intent
     if classification.has_feedback and classification.target_signals:
-        candidates = get_routine_candidates(payload.user_id, days_back=60)[:5]
+        candidates = (await asyncio.to_thread(get_routine_candidates, payload.user_id, 60))[:5]
 
         if candidates:
             target_signals = dict(classification.target_signals or {})
             target_signals["raw_feedback_text"] = payload.message
-            routine_id, resolution_metadata = resolve_routine_for_feedback(
+            routine_id, resolution_metadata = await asyncio.to_thread(
+                resolve_routine_for_feedback,
                 candidates,
                 target_signals,
                 payload.chat_id,
@@ -245,7 +306,8 @@ async def chat_message(payload: ChatMessageRequest):
             update_current_span(metadata={"feedback_resolution": resolution_metadata})
 
             if routine_id:
-                save_episode(
+                await asyncio.to_thread(
+                    save_episode,
                     payload.user_id,
                     routine_id,
                     classification.outcome_type,
@@ -261,7 +323,7 @@ async def chat_message(payload: ChatMessageRequest):
                     lines.append(f"{i}. {routine_title}")
 
                 clarification_text = "\n".join(lines)
-                save_message(payload.chat_id, "assistant", clarification_text)
+                await asyncio.to_thread(save_message, payload.chat_id, "assistant", clarification_text)
                 return {"type": "clarification", "text": clarification_text}
 
     # Step 4: Handle action intent (ROUTINE_GENERATION or REASONING)
@@ -270,25 +332,37 @@ async def chat_message(payload: ChatMessageRequest):
     if action_intent == "FEEDBACK":
         # Pure feedback with no other intent
         ack_text = "Thanks for the feedback! I've noted that for your training history."
-        save_message(payload.chat_id, "assistant", ack_text)
+        await asyncio.to_thread(save_message, payload.chat_id, "assistant", ack_text)
         return {"type": "chat", "text": ack_text}
 
-    # Route to generation pipeline with override
-    response = run_chat_turn(
+    turn_kwargs = dict(
         query=enriched_query,
         profile=profile,
         client=client,
         override_intent=action_intent,
-        episodes=episodes
+        episodes=episodes,
+        query_params=classification.query_params
     )
 
+    if payload.stream and action_intent == "REASONING":
+        update_current_span(metadata={"response_type": "advice", "streamed": True})
+        return StreamingResponse(
+            _stream_advice_turn(payload.chat_id, **turn_kwargs),
+            media_type="text/event-stream"
+        )
+
+    # Route to generation pipeline with override
+    response = await run_chat_turn_async(**turn_kwargs)
+
     # Handle routine generation
     if isinstance(response, dict) and response.get("type") == "routine":
         routine_json = response.get("routine_json") or {}
-        routine_id = save_routine(routine_json, payload.user_id)
+        routine_id = await asyncio.to_thread(save_routine, routine_json, payload.user_id)
         assistant_text = f"I've generated a routine for you based on your training data.\n\n[routine:{routine_id}]"
 
-        save_message(payload.chat_id, "assistant", assistant_text, routine_id=routine_id)
+        await asyncio.to_thread(
+            save_message, payload.chat_id, "assistant", assistant_text, routine_id=routine_id
+        )
 
         update_current_span(metadata={
             "response_type": "routine",
@@ -300,7 +374,7 @@ async def chat_message(payload: ChatMessageRequest):
     # Handle advice generation
     if isinstance(response, dict) and response.get("type") == "advice":
         advice_text = response.get("advice", "")
-        save_message(payload.chat_id, "assistant", advice_text)
+        await asyncio.to_thread(save_message, payload.chat_id, "assistant", advice_text)
 
         update_current_span(metadata={
             "response_type": "advice",
@@ -309,6 +383,14 @@ async def chat_message(payload: ChatMessageRequest):
 
         return {"type": "chat", "text": advice_text}
 
+    # Generation unavailable (e.g. circuit open): nothing is saved
+    if isinstance(response, dict) and response.get("type") == "error":
+        update_current_span(metadata={
+            "response_type": "error",
+            "error": response.get("error")
+        })
+        raise HTTPException(status_code=503, detail=response.get("error"))
+
     # Unexpected response shape
     update_current_span(metadata={
         "response_type": "error",
@@ -1,5 +1,6 @@
 import os
 import tempfile
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from fastapi import APIRouter, File, Form, UploadFile
@@ -7,6 +8,7 @@ from pydantic import BaseModel
 
 from agentic.src.main_profile_gen import run_profile_generation
 from agentic.src.data_access import extract_query_params
+from agentic.src.llm_client import get_client
 from agentic.src.rag_pipeline import get_relevant_facts, generate_routine
 from backend.storage.profile_store import save_csv, save_profile, get_profile
 from backend.storage.routine_store import save_routine
@@ -20,13 +22,12 @@ class GenerateRoutinesRequest(BaseModel):
     goal: str
 
 
+@lru_cache(maxsize=1)
 def _get_openai_client():
+    # Shared client (Opik wrapping, rate limiting, pooled connections),
+    # resolved once per process
     load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return None
-    from openai import OpenAI
-    return OpenAI(api_key=api_key)
+    return get_client(os.getenv("OPENAI_API_KEY"))
 
 
 @router.post("/upload")
@@ -84,7 +85,9 @@ async def generate_routines(payload: GenerateRoutinesRequest):
     facts = get_relevant_facts(params, profile)
 
     # Generate the routine
-    routine_json = generate_routine(payload.goal, facts, client)
+    routine_json, _ = generate_routine(payload.goal, facts, client)
+    if routine_json is None:
+        return {"error": "Routine generation is temporarily unavailable. Please try again shortly."}
 
     # Persist it
     routine_id = save_routine(routine_json, payload.user_id)
@@ -1,8 +1,9 @@
-import json
 import uuid
 from datetime import datetime
 from typing import List, Dict, Any
 
+import orjson
+
 from backend.storage.db import get_connection, rows_to_dicts
 
 
@@ -98,14 +99,14 @@ def get_routine_candidates(user_id: str, days_back: int = 60) -> List[Dict[str,
     candidates = []
     for row in rows:
         try:
-            routine_json = json.loads(row["routine_json"])
+            routine_json = orjson.loads(row["routine_json"])
             candidates.append({
                 "id": row["id"],
                 "routine_json": routine_json,
                 "last_mentioned_at": row["last_mentioned_at"],
                 "existing_outcomes": row["existing_outcomes"],
             })
-        except (json.JSONDecodeError, KeyError):
+        except (orjson.JSONDecodeError, KeyError):
             continue
     
     return candidates
@@ -136,7 +137,7 @@ def get_episodes_by_user(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
     episodes = []
     for row in rows:
         try:
-            routine_json = json.loads(row["routine_json"])
+            routine_json = orjson.loads(row["routine_json"])
             episodes.append({
                 "routine_id": row["routine_id"],
                 "routine_json": routine_json,
@@ -144,7 +145,7 @@ def get_episodes_by_user(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
                 "outcome_text": row["outcome_text"],
                 "created_at": row["created_at"],
             })
-        except (json.JSONDecodeError, KeyError):
+        except (orjson.JSONDecodeError, KeyError):
             continue
     
     return episodes
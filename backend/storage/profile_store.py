@@ -1,11 +1,22 @@
-import json
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+import orjson
 
 from backend.storage.db import get_connection, rows_to_dicts
 
 
+# Parsed profiles keyed by user_id and validated against generated_at, so an
+# unchanged profile is reused across requests along with the fact lines
+# memoized on it by get_relevant_facts
+_PROFILE_CACHE_SIZE = 256
+_profile_cache: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+_profile_cache_lock = threading.Lock()
+
+
 def _init_db() -> None:
     conn = get_connection()
     conn.execute(
@@ -75,21 +86,40 @@ def save_profile(user_id: str, profile: Dict[str, Any]) -> None:
         INSERT OR REPLACE INTO user_profiles (user_id, profile_json, generated_at)
         VALUES (?, ?, ?)
         """,
-        (user_id, json.dumps(profile), generated_at),
+        (user_id, orjson.dumps(profile, option=orjson.OPT_SERIALIZE_NUMPY, default=str).decode(), generated_at),
     )
     conn.commit()
+    with _profile_cache_lock:
+        _profile_cache.pop(user_id, None)
 
 
 def get_profile(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Retrieve a user's profile.
+
+    The returned dict is shared between requests for the same profile
+    revision; callers must not modify it.
     """
     conn = get_connection()
     cursor = conn.execute(
-        "SELECT profile_json FROM user_profiles WHERE user_id = ?",
+        "SELECT profile_json, generated_at FROM user_profiles WHERE user_id = ?",
         (user_id,),
     )
     rows = rows_to_dicts(cursor)
     if not rows:
         return None
-    return json.loads(rows[0]["profile_json"])
+
+    generated_at = rows[0]["generated_at"]
+    with _profile_cache_lock:
+        cached = _profile_cache.get(user_id)
+        if cached is not None and cached[0] == generated_at:
+            _profile_cache.move_to_end(user_id)
+            return cached[1]
+
+    profile = orjson.loads(rows[0]["profile_json"])
+    with _profile_cache_lock:
+        _profile_cache[user_id] = (generated_at, profile)
+        _profile_cache.move_to_end(user_id)
+        if len(_profile_cache) > _PROFILE_CACHE_SIZE:
+            _profile_cache.popitem(last=False)
+    return profile
@@ -1,8 +1,9 @@
-import json
 import uuid
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 
+import orjson
+
 from backend.storage.db import get_connection, rows_to_dicts
 
 
@@ -40,7 +41,7 @@ def save_routine(routine: Dict[str, Any], user_id: str) -> str:
     conn = get_connection()
     conn.execute(
         "INSERT INTO routines (id, user_id, routine_json, created_at) VALUES (?, ?, ?, ?)",
-        (routine_id, user_id, json.dumps(routine), created_at),
+        (routine_id, user_id, orjson.dumps(routine).decode(), created_at),
     )
     conn.commit()
     return routine_id
@@ -58,7 +59,7 @@ def get_routine(routine_id: str, user_id: str) -> Optional[Dict[str, Any]]:
     rows = rows_to_dicts(cursor)
     if not rows:
         return None
-    return json.loads(rows[0]["routine_json"])
+    return orjson.loads(rows[0]["routine_json"])
 
 
 def list_routines(user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
@@ -79,7 +80,7 @@ def list_routines(user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
     rows = rows_to_dicts(cursor)
     routines = []
     for row in rows:
-        routine_json = json.loads(row["routine_json"])
+        routine_json = orjson.loads(row["routine_json"])
         routines.append({
             "id": row["id"],
             "created_at": row["created_at"],